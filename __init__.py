@@ -1,11 +1,82 @@
-from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-import uuid
+from selenium.common.exceptions import NoSuchElementException, NoSuchFrameException, StaleElementReferenceException, TimeoutException
+import importlib
+import os
+import sys
+import weakref
 from time import sleep, time
-import random
+
+
+# Importing selenium's web driver, waits and expected conditions takes a few
+# hundred milliseconds, so they are imported the first time they're used.
+# This keeps `import selentric` fast for processes that never drive a
+# browser, like the job queue, snapshot and template generator tools.
+_LAZY_IMPORTS = {
+    'WebDriver': ('selenium.webdriver.remote.webdriver', 'WebDriver'),
+    'WebDriverWait': ('selenium.webdriver.support.wait', 'WebDriverWait'),
+    'Select': ('selenium.webdriver.support.select', 'Select'),
+}
+
+
+def __getattr__(name):
+    """
+    Import `WebDriver`, `WebDriverWait` and `Select` from selenium the first
+    time they're imported from selentric.
+
+    :param name:
+    :return:
+    """
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module, attribute = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module), attribute)
+    globals()[name] = value
+    return value
+
+
+class LazyModule(object):
+    """
+    Stand in for a module of functions that is imported the first time one
+    of its functions is called.  This lets `PageTemplate`s register selenium's
+    expected conditions without importing them until `matches` runs.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.module = None
+        self.functions = {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name not in self.functions:
+            self.functions[name] = LazyFunction(self, name)
+        return self.functions[name]
+
+    def load(self):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return self.module
+
+
+class LazyFunction(object):
+    """
+    A function from a `LazyModule`, imported the first time it's called.
+    """
+    def __init__(self, module: LazyModule, name: str):
+        self.module = module
+        self.__name__ = name
+        self.function = None
+
+    def __call__(self, *args, **kwargs):
+        if self.function is None:
+            self.function = getattr(self.module.load(), self.__name__)
+        return self.function(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<lazy {self.module.name}.{self.__name__}>'
+
+
+EC = LazyModule('selenium.webdriver.support.expected_conditions')
 
 
 def fail_gracefully(*excs, debug=False):
@@ -33,6 +104,143 @@ def fail_gracefully(*excs, debug=False):
     return decorator
 
 
+class BrowsingContext(object):
+    """
+    This object keeps track of which frame a web driver is currently switched
+    into so that `Locator`s living inside of iframes only call
+    `driver.switch_to` when they actually need to.
+
+    A frame path is a tuple of frame references, starting from the top-level
+    document.  Each reference is anything `driver.switch_to.frame` accepts
+    (a frame name/id string or a frame index), or a `Locator` describing the
+    frame element.  Moving between two paths only leaves and enters the frames
+    that differ, so several `Locator`s sharing a frame are looked up without
+    switching in and out for every access.
+
+    There is one `BrowsingContext` per web driver.  Get it with
+    `BrowsingContext.of(driver)`.
+
+    Selenium resets the driver to the top-level document after navigating
+    or switching windows.  `Page.locate_window` takes care of the latter, but
+    if you switch frames by hand call `invalidate` so the next lookup starts
+    from the top-level document.
+
+    Lookups don't switch back out of a frame when they are done, so the
+    driver may be left inside of an iframe.  The `Page` helpers switch back
+    to the top-level document before using the driver directly.  Call
+    `BrowsingContext.of(driver).enter(())` before using the driver yourself,
+    e.g. for `driver.find_element` or `driver.execute_script`.
+    """
+    _contexts = weakref.WeakKeyDictionary()
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.path = ()
+
+    @staticmethod
+    def of(driver):
+        """
+        Get the `BrowsingContext` for the given web driver, creating it the
+        first time the driver is seen.
+
+        :param driver:
+        :return BrowsingContext:
+        """
+        context = BrowsingContext._contexts.get(driver)
+        if context is None:
+            context = BrowsingContext(driver)
+            BrowsingContext._contexts[driver] = context
+        return context
+
+    def invalidate(self):
+        """
+        Forget which frame the driver is switched into.  The next call to
+        `enter` will start from the top-level document.
+
+        :return:
+        """
+        self.path = None
+        return self
+
+    def reset(self):
+        """
+        Record that the driver is on the top-level document, e.g. after
+        switching windows.
+
+        :return:
+        """
+        self.path = ()
+        return self
+
+    def enter(self, path: tuple = ()):
+        """
+        Switch the driver into the frame described by `path`, leaving and
+        entering only the frames that differ from the current path.
+
+        Returns True if the driver had to be switched, False if it was
+        already in the right frame.
+
+        :param path:
+        :return bool:
+        """
+        if self.path == path:
+            return False
+        switch_to = self.driver.switch_to
+        shared = 0
+        if self.path is not None:
+            for current, target in zip(self.path, path):
+                if current is not target and current != target:
+                    break
+                shared += 1
+        try:
+            if self.path is None or (shared == 0 and self.path):
+                switch_to.default_content()
+            else:
+                for _ in range(len(self.path) - shared):
+                    switch_to.parent_frame()
+            for frame in path[shared:]:
+                if isinstance(frame, Locator):
+                    frame = self.driver.find_element(frame.by, frame.locator)
+                switch_to.frame(frame)
+        except Exception:
+            self.path = None
+            raise
+        self.path = path
+        return True
+
+
+def frame_path(frame) -> tuple:
+    """
+    Normalize the `frame` kwarg of a `Locator` into a frame path tuple.
+
+    :param frame:
+    :return tuple:
+    """
+    if frame is None:
+        return ()
+    if isinstance(frame, (list, tuple)):
+        return tuple(frame)
+    return (frame,)
+
+
+def batch_by_frame(items, frames_of, current=()):
+    """
+    Reorder items so that everything living in the same frame is grouped
+    together, starting with the frame the driver is currently in.  The
+    order of items within a frame is kept.
+
+    :param items:
+    :param frames_of: function returning the frame path of an item
+    :param current: frame path the driver is currently in
+    :return:
+    """
+    batches = {current: []}
+    for item in items:
+        batches.setdefault(frames_of(item), []).append(item)
+    for batch in batches.values():
+        yield from batch
+
+
 class Locator(object):
     """
     This object stores the information needed to look up a webpage
@@ -65,7 +273,7 @@ class Locator(object):
     """
     driver = None
 
-    def __init__(self, by: By = By.ID, locator: str = '', name: str = '', parent=None, multiple=False, driver=None, selector=False, filter_func=lambda element: element):
+    def __init__(self, by: By = By.ID, locator: str = '', name: str = '', parent=None, multiple=False, driver=None, selector=False, filter_func=lambda element: element, frame=None, shadow_root=False, keep_results=True):
         """
         Initialize the Locator.  Store the information about how the locator should
         locate web elements.
@@ -96,12 +304,33 @@ class Locator(object):
         result.  The default filter does nothing.  Return a selenium web element,
         or a list of filtered selenium web elements.
 
+        Use the `frame` kwarg for elements that live inside of an iframe.  Pass
+        a frame name/id, a frame index, or a `Locator` for the iframe element.
+        For nested iframes pass a list, starting with the outermost frame.  The
+        driver is only switched between frames when the previous lookup
+        happened in a different frame.  Child Locators use their parent's
+        frame unless they are given one.
+
+        Set `shadow_root` to `True` to search inside of the shadow root attached
+        to the `parent` element instead of the parent element itself.
+
+        Set `keep_results` to `False` for long running sessions.  The Locator
+        will then let go of the web element it found as soon as one of its
+        attributes or methods is used through the Locator (e.g.
+        `search_input.send_keys(...)`), or it is accessed as a `Page` or
+        `PageTemplate` attribute, instead of holding on to it until the next
+        lookup.  Calling `find()` or the Locator itself keeps the result until
+        `release()` is called.
+
         :param by:
         :param locator:
         :param name:
         :param parent:
         :param multiple:
         :param driver:
+        :param frame:
+        :param shadow_root:
+        :param keep_results:
         """
         self.by = by
         self.locator = locator
@@ -114,6 +343,13 @@ class Locator(object):
         self.results = []
         self.selector = selector
         self.filter = filter_func
+        if frame is None and parent is not None:
+            self.frames = parent.frames
+        else:
+            self.frames = frame_path(frame)
+        self.shadow_root = shadow_root
+        self.keep_results = keep_results
+        self.prefetched = None
 
     def __getattr__(self, name):
         """
@@ -142,7 +378,10 @@ class Locator(object):
         if self.element is None:
             if result is None:
                 raise NoSuchElementException(f"{self.name} unable to locate element by {self.by}, with locator '{self.locator}'")
-        return getattr(self.element, name)
+        attribute = getattr(self.element, name)
+        if not self.keep_results:
+            self.release()
+        return attribute
 
     def __call__(self, *args, **kwargs):
         """
@@ -171,10 +410,59 @@ class Locator(object):
         """
         Locator.driver = driver
 
+    def release(self):
+        """
+        Let go of the web elements found by the last lookup.  The next time the
+        element is needed it will be looked up again.
+
+        :return:
+        """
+        self.element = None
+        self.results = []
+        self.found = False
+        self.prefetched = None
+        return self
+
+    def memory_usage(self):
+        """
+        Count the web elements this Locator is holding on to and estimate how
+        many bytes they take up.
+
+        :return dict:
+        """
+        held = self.element if type(self.element) == list else [] if self.element is None else [self.element]
+        held_ids = {id(element) for element in held}
+        results = [result for result in self.results if id(result) not in held_ids]
+        size = sys.getsizeof(self.results)
+        if type(self.element) == list:
+            size += sys.getsizeof(self.element)
+        for element in held + results:
+            size += sys.getsizeof(element) + sys.getsizeof(getattr(element, '__dict__', None))
+        return {'elements': len(held), 'results': len(self.results), 'bytes': size}
+
     @fail_gracefully(NoSuchElementException)
     def find_gracefully(self):
         return self.find()
 
+    def search_context(self, driver):
+        """
+        Get the object this Locator's element should be searched for in.  This
+        is the web driver, the parent web element, or the parent web element's
+        shadow root.  The driver must already be switched into this Locator's
+        frame.
+
+        :param driver:
+        :return:
+        """
+        if self.parent is None:
+            return driver
+        parent = self.parent()
+        if not self.parent.keep_results:
+            self.parent.release()
+        if self.shadow_root:
+            return parent.shadow_root
+        return parent
+
     def find(self):
         """
         Attempt to locate the web page element described by the Locator.
@@ -182,21 +470,16 @@ class Locator(object):
         :return:
         """
         driver = Locator.driver if self.driver is None else self.driver
-        if self.parent is not None:  # Parent locators
-            parent = self.parent()
-            if not self.multiple:  # Parent with one result.
-                result = parent.find_element(self.by, self.locator)
-            else:  # Multiple results using parent
-                result = parent.find_elements(self.by, self.locator)
-                self.results = result
-        else:  # No parents
-            if not self.multiple:  # Single result, no parent
-                result = driver.find_element(self.by, self.locator)
-            else:  # Multiple results, no parent
-                result = driver.find_elements(self.by, self.locator)
+        if self.prefetched is not None:
+            # Found by `Page.expect` when the page matched, use it once.
+            result, self.prefetched = self.prefetched, None
+            if self.multiple:
                 self.results = result
+        else:
+            result = self._find(driver)
 
         if result is not None and self.selector and not self.multiple:
+            from selenium.webdriver.support.select import Select
             result = Select(result)
 
         self.element = result if result else None
@@ -212,6 +495,38 @@ class Locator(object):
 
         return self.filter(self.element)
 
+    def _find(self, driver):
+        """
+        Switch into this Locator's frame and run the selenium lookup.
+
+        :param driver:
+        :return:
+        """
+        context = BrowsingContext.of(driver)
+        switched = context.enter(self.frames)
+        try:
+            return self._lookup(driver)
+        except (NoSuchElementException, NoSuchFrameException, StaleElementReferenceException):
+            if switched or not self.frames:
+                raise
+            # The driver drops back to the top-level document when it
+            # navigates, so the remembered frame may be out of date.
+            context.invalidate().enter(self.frames)
+            return self._lookup(driver)
+
+    def _lookup(self, driver):
+        """
+        Run the selenium lookup in the current frame.
+
+        :param driver:
+        :return:
+        """
+        search_context = self.search_context(driver)
+        if not self.multiple:
+            return search_context.find_element(self.by, self.locator)
+        self.results = search_context.find_elements(self.by, self.locator)
+        return self.results
+
 
 class element_is_disabled(object):
     """
@@ -259,8 +574,19 @@ class PageTemplate(object):
     """
     driver = None
 
-    def __init__(self, driver=None):
+    def __init__(self, driver=None, keep_results=True):
+        """
+        Set `keep_results` to `False` for long running sessions.  Every `Locator`
+        added to the template, and their parent Locators, will let go of the web
+        elements they find once they are accessed as attributes of the template
+        or its `Page` (see `Locator`).  Unnamed Locators used only for matching
+        are not added to the `locators` dictionary.
+
+        :param driver:
+        :param keep_results:
+        """
         self.driver = driver
+        self.keep_results = keep_results
         self.expected_conditions = []
         self.locators = {}
 
@@ -287,11 +613,24 @@ class PageTemplate(object):
         """
         if name not in self.locators:
             raise AttributeError(f'No attribute "{name}" exists on object and no key of "{name}" exists in locator dictionary.')
-        result = self.locators[name].find()
-        if self.locators[name].element is None or not self.locators[name]:
+        return self.find_locator(name)
+
+    def find_locator(self, name: str):
+        """
+        Locate the web element for a `Locator` using its lookup name.
+
+        :param name:
+        :return:
+        """
+        locator = self.locators[name]
+        result = locator.find()
+        if locator.element is None or not locator:
             if result is None:
-                raise NoSuchElementException(f"{self.locators[name].name} unable to locate element by {self.locators[name].by}, with locator '{self.locators[name].locator}'")
-        return self.locators[name].element
+                raise NoSuchElementException(f"{locator.name} unable to locate element by {locator.by}, with locator '{locator.locator}'")
+        element = locator.element
+        if not locator.keep_results:
+            locator.release()
+        return element
 
     def match_url(self, url: str):
         """
@@ -320,12 +659,16 @@ class PageTemplate(object):
         Create an attribute on this object with a name matching the given
         Locator's name, with the value being the Locator itself.
         """
-        new_id = uuid.uuid4().hex
+        if element.driver is None:
+            element.driver = self.driver
+        if not self.keep_results:
+            self._release_after_use(element)
+            if not element.name:
+                return
+        new_id = os.urandom(16).hex()
         element_name = element.name if element.name else new_id
         setattr(self, element_name, element)
         self.locators[element_name] = element
-        if element.driver is None:
-            element.driver = self.driver
 
     def match_presence(self, element: Locator):
         """
@@ -336,12 +679,12 @@ class PageTemplate(object):
         :return:
         """
         self._set_locator(element)
-        self.expected_conditions.append((EC.presence_of_element_located, [(element.by, element.locator)]))
+        self.expected_conditions.append((EC.presence_of_element_located, [(element.by, element.locator)], element))
         return self
 
     def match_disabled(self, element: Locator):
         self._set_locator(element)
-        self.expected_conditions.append((element_is_disabled, [(element.by, element.locator)]))
+        self.expected_conditions.append((element_is_disabled, [(element.by, element.locator)], element))
         return self
 
     def match_visibility(self, element: Locator):
@@ -354,7 +697,7 @@ class PageTemplate(object):
         :return:
         """
         self._set_locator(element)
-        self.expected_conditions.append((EC.visibility_of_element_located, [(element.by, element.locator)]))
+        self.expected_conditions.append((EC.visibility_of_element_located, [(element.by, element.locator)], element))
         return self
 
     def match_invisibility(self, element: Locator):
@@ -367,7 +710,7 @@ class PageTemplate(object):
         :return:
         """
         self._set_locator(element)
-        self.expected_conditions.append((EC.invisibility_of_element_located, [(element.by, element.locator)]))
+        self.expected_conditions.append((EC.invisibility_of_element_located, [(element.by, element.locator)], element))
         return self
 
     def match_title(self, title):
@@ -403,7 +746,7 @@ class PageTemplate(object):
         :return:
         """
         self._set_locator(element)
-        self.expected_conditions.append((EC.text_to_be_present_in_element, [(element.by, element.locator), text]))
+        self.expected_conditions.append((EC.text_to_be_present_in_element, [(element.by, element.locator), text], element))
         return self
 
     def match_element_value_text(self, element: Locator, text):
@@ -418,7 +761,7 @@ class PageTemplate(object):
         :return:
         """
         self._set_locator(element)
-        self.expected_conditions.append((EC.text_to_be_present_in_element_value, [(element.by, element.locator), text]))
+        self.expected_conditions.append((EC.text_to_be_present_in_element_value, [(element.by, element.locator), text], element))
         return self
 
     def match_clickable_element(self, element: Locator):
@@ -431,7 +774,7 @@ class PageTemplate(object):
         :return:
         """
         self._set_locator(element)
-        self.expected_conditions.append((EC.element_to_be_clickable, [(element.by, element.locator)]))
+        self.expected_conditions.append((EC.element_to_be_clickable, [(element.by, element.locator)], element))
         return self
 
     def match_alert_present(self):
@@ -468,8 +811,20 @@ class PageTemplate(object):
         setattr(self, name, element)
         element.name = name
         self.locators[name] = element
+        if not self.keep_results:
+            self._release_after_use(element)
         return self
 
+    @staticmethod
+    def _release_after_use(element: Locator):
+        """
+        Make the Locator, and its parent Locators, let go of the web elements
+        they find once they have been used.
+        """
+        while element is not None:
+            element.keep_results = False
+            element = element.parent
+
     def matches(self, timeout=.01, debug=False, poll_frequency=.1):
         """
         Perform the template match and return True/False if the template
@@ -486,21 +841,129 @@ class PageTemplate(object):
         :return bool:
         """
 
-        for wait in self.expected_conditions:
+        from selenium.webdriver.support.wait import WebDriverWait
+
+        context = BrowsingContext.of(self.driver)
+        current = context.path
+
+        def frames_of(condition):
+            # Conditions without a Locator (url, title, alerts) don't care
+            # which frame the driver is in.
+            return condition[2].frames if len(condition) > 2 else current
+
+        for wait in batch_by_frame(self.expected_conditions, frames_of, current):
             try:
                 expected_condition = wait[0]
                 args = wait[1]
-                el = WebDriverWait(self.driver, timeout if timeout else 0.01, poll_frequency).until(
+                search_context = self.driver
+                if len(wait) > 2:
+                    element = wait[2]
+                    context.enter(element.frames)
+                    if element.shadow_root:
+                        search_context = element.search_context(self.driver)
+                el = WebDriverWait(search_context, timeout if timeout else 0.01, poll_frequency).until(
                     expected_condition(*args)
                 )
             except TimeoutException:
                 if debug: print(f'Timeout: Unable to locate element {wait}')
-                return False
+                return self._no_match(context)
+            except (NoSuchElementException, NoSuchFrameException, StaleElementReferenceException):
+                if debug: print(f'Unable to locate frame or shadow root for {wait}')
+                return self._no_match(context)
             if not el:
                 if debug: print(f'Unable to locate element {wait}')
-                return False
+                return self._no_match(context)
         return True
 
+    @staticmethod
+    def _no_match(context):
+        """
+        The page may have navigated since the driver was switched into a
+        frame, so forget the frame and start from the top-level document on
+        the next match attempt.
+
+        :param context:
+        :return bool:
+        """
+        if context.path:
+            context.invalidate()
+        return False
+
+    def find_locators(self, *names):
+        """
+        Locate the web elements for several `Locator`s at once using their
+        lookup names.  Locators that share a frame are looked up together, so
+        the driver switches into each frame at most once.
+
+        The web elements are returned in the same order as the given names.
+
+        :param names:
+        :return list:
+        """
+        current = BrowsingContext.of(self.driver).path
+        elements = {}
+        for name in batch_by_frame(names, lambda name: self.locators[name].frames, current):
+            elements[name] = self.find_locator(name)
+        return [elements[name] for name in names]
+
+    def release(self):
+        """
+        Let go of the web elements found by all of this template's `Locator`s.
+
+        :return:
+        """
+        for locator in self.locators.values():
+            locator.release()
+            parent = locator.parent
+            while parent is not None:
+                parent.release()
+                parent = parent.parent
+        return self
+
+    def discard_prefetched(self):
+        """
+        Drop the web elements prefetched by `Page.expect` that haven't been
+        used yet.  They belong to the page that matched at the time, which may
+        not be the current page any more.
+
+        :return:
+        """
+        for locator in self.locators.values():
+            locator.prefetched = None
+        return self
+
+    def memory_report(self):
+        """
+        Report how many web elements this template's `Locator`s are holding on
+        to, and roughly how many bytes they take up.
+
+        Parent Locators that aren't added to the template are included under
+        their child's name, e.g. `search_results.parent`.
+
+        :return dict:
+        """
+        usage = {name: locator.memory_usage() for name, locator in self.locators.items()}
+        seen = {id(locator) for locator in self.locators.values()}
+        parents = 0
+        for name, locator in self.locators.items():
+            parent = locator.parent
+            while parent is not None and id(parent) not in seen:
+                seen.add(id(parent))
+                name = f'{name}.parent'
+                usage[name] = parent.memory_usage()
+                parents += 1
+                parent = parent.parent
+        return {
+            'template': self.__class__.__name__,
+            'locators': len(self.locators),
+            'unnamed_locators': sum(1 for locator in self.locators.values() if not locator.name),
+            'parent_locators': parents,
+            'elements': sum(locator['elements'] for locator in usage.values()),
+            'results': sum(locator['results'] for locator in usage.values()),
+            'bytes': sum(locator['bytes'] for locator in usage.values()),
+            'by_locator': usage,
+        }
+
 
 class Page(object):
     """
@@ -514,8 +977,17 @@ class Page(object):
     use a `Locator` directly, you can bypass the automatic nature of selentric
     objects by calling the `Page.locator` method.  This will give you the
     `Locator`, but no lookups in the DOM will be performed by selenium.
+
+    Call `capture_snapshots` with a `selentric.snapshots.SnapshotWriter` to
+    save the page source every time the page matches its template.
+
+    Call `expect` before `wait_for_match` to have the web elements you are
+    about to read found in the same round trip that sees the page match.
     """
-    def __init__(self, template_matcher: PageTemplate, driver: WebDriver):
+    snapshots = None
+    expected = None
+
+    def __init__(self, template_matcher: PageTemplate, driver: 'WebDriver'):
         """
         There must be a PageTemplate for the Page object to use.
         """
@@ -531,11 +1003,7 @@ class Page(object):
         """
         if name not in self.matcher.locators:
             raise AttributeError(f'No attribute "{name}" exists on object and no key of "{name}" exists in matchers locator dictionary.')
-        result = self.matcher.locators[name].find()
-        if self.matcher.locators[name].element is None or not self.matcher.locators[name]:
-            if result is None:
-                raise NoSuchElementException(f"{self.matcher.locators[name].name} unable to locate element by {self.matcher.locators[name].by}, with locator '{self.matcher.locators[name].locator}'")
-        return self.matcher.locators[name].element
+        return self.matcher.find_locator(name)
 
     @staticmethod
     def randomly_wait(low, high):
@@ -545,7 +1013,8 @@ class Page(object):
         :param low:
         :param high:
         """
-        sleep(random.randint(low, high))
+        from random import randint
+        sleep(randint(low, high))
 
     def locate_window(self, timeout=-1, poll_frequency=.5):
         """
@@ -564,22 +1033,101 @@ class Page(object):
         while True:
             for wh in self.matcher.driver.window_handles:
                 self.matcher.driver.switch_to.window(wh)
-                if self.matches(debug=True):
+                BrowsingContext.of(self.matcher.driver).reset()
+                self.matcher.discard_prefetched()
+                if self.matches(debug=True, capture=False):
                     print(f'Found window for {self.__class__.__name__}')
+                    self.snapshot('locate_window')
                     return
                 if -1 < timeout < time() - t1:
                     raise Exception(f'Cannot located window handle matching {self.__class__.__name__} in {timeout} seconds.')
                 sleep(poll_frequency)
 
-    def matches(self, debug=False, timeout=.01):
+    def matches(self, debug=False, timeout=.01, capture=True):
         """
         Use this `Page`'s `PageTemplate` to check that the current web
         page matches the `PageTemplate`.
 
+        If snapshots are being captured, a snapshot is taken when the page
+        matches, unless `capture` is `False`.
+
         :param debug:
+        :param capture:
+        :return:
+        """
+        result = self.matcher.matches(debug=debug, timeout=timeout)
+        if result and capture:
+            self.snapshot('matches')
+        return result
+
+    def capture_snapshots(self, writer):
+        """
+        Capture a snapshot of the web page with the given `SnapshotWriter`
+        whenever the page matches the template.  Pass `None` to stop
+        capturing snapshots.
+
+        :param writer:
+        :return:
+        """
+        self.snapshots = writer
+        return self
+
+    def snapshot(self, event: str = 'snapshot'):
+        """
+        Hand a snapshot of the current web page to the `SnapshotWriter`, if
+        snapshots are being captured.  The writer compresses and saves the
+        snapshot on a background thread.
+
+        Snapshots are skipped for templates that wait for an alert, since
+        reading the page source would dismiss the alert.  Errors while
+        capturing are counted in the writer's `errors` instead of being
+        raised.
+
+        :param event:
+        :return:
+        """
+        if self.snapshots is None:
+            return self
+        for condition in self.matcher.expected_conditions:
+            if getattr(condition[0], '__name__', None) == 'alert_is_present':
+                return self
+        try:
+            # The template may have left the driver inside of an iframe.
+            BrowsingContext.of(self.driver).enter(())
+            self.snapshots.capture(self.driver, page=self.__class__.__name__, event=event)
+        except Exception as e:
+            self.snapshots.record_error(e)
+        return self
+
+    def find_locators(self, *names):
+        """
+        Locate the web elements for several of the `PageTemplate`'s `Locator`s
+        at once.  Locators that share a frame are looked up together.
+
+        :param names:
+        :return list:
+        """
+        return self.matcher.find_locators(*names)
+
+    def release(self):
+        """
+        Let go of the web elements held by the `PageTemplate`'s `Locator`s.  Call
+        this between jobs in long running sessions so old web elements can be
+        garbage collected.
+
         :return:
         """
-        return self.matcher.matches(debug=debug, timeout=timeout)
+        self.matcher.release()
+        return self
+
+    def memory_report(self):
+        """
+        Report how many web elements the `PageTemplate`'s `Locator`s are
+        holding on to.  See `PageTemplate.memory_report`.
+
+        :return dict:
+        """
+        return self.matcher.memory_report()
 
     def locator(self, locator_name: str):
         """
@@ -601,13 +1149,98 @@ class Page(object):
         :param poll_frequency:
         :param timeout:
         """
+        self.matcher.discard_prefetched()
+        if self.expected is not None:
+            return self._wait_for_expected(poll_frequency, timeout)
         print(f'Waiting for page to match {self.__class__.__name__}')
         t1 = time()
-        while not self.matches(timeout=0):
+        while not self.matches(timeout=0, capture=False):
             sleep(poll_frequency)
             if -1 < timeout < time() - t1:
                 raise TimeoutException(f'No match for {self.__class__.__name__} found in {timeout} seconds.')
         print(f'Page matches {self.__class__.__name__}!')
+        self.snapshot('wait_for_match')
+        return self
+
+    def expect(self, *names, template: PageTemplate = None, properties=('text',)):
+        """
+        Declare the `Locator`s that will be read as soon as the next
+        `wait_for_match` succeeds.  Instead of polling the template from
+        python, `wait_for_match` runs one script in the browser that waits
+        for the template to match, then finds the named Locators' web
+        elements and reads the given properties in the same round trip.
+
+        The web elements are used by the next lookup of each Locator, and
+        `text`/`get_attribute` for the given properties don't go back to the
+        browser.  Any that haven't been used are dropped by the next `expect`
+        or `wait_for_match`.  Pass `template` to wait for a different
+        `PageTemplate` than this page's, e.g. the page the controller is about
+        to navigate to.  No snapshot is captured when waiting for another
+        template, since the snapshot would be labelled with this page's name.
+
+        The web elements are read the moment the template matches, so the
+        template should not also match the page you are navigating away from.
+
+        Templates that can't be checked from inside the page (alerts, custom
+        expected conditions, Locators inside of iframes) are matched and the
+        Locators found the usual way.  Either way, a Locator that isn't found
+        is skipped and looked up again when it's used.
+
+        Example:
+            self.search_button.click()
+            self.expect('search_results').wait_for_match()
+            return self.search_results
+
+        :param names:
+        :param template:
+        :param properties:
+        :return:
+        """
+        template = template if template is not None else self.matcher
+        template.discard_prefetched()
+        self.expected = (template, names, properties)
+        return self
+
+    def _wait_for_expected(self, poll_frequency, timeout):
+        """
+        Wait for the template given to `expect` to match and prefetch its
+        Locators.
+
+        :param poll_frequency:
+        :param timeout:
+        :return:
+        """
+        from .prefetch import TemplateWatcher, WATCH_BUDGET
+
+        template, names, properties = self.expected
+        self.expected = None
+        template.discard_prefetched()
+        watcher = TemplateWatcher(template, names, properties)
+        print(f'Waiting for page to match {template.__class__.__name__}')
+        t1 = time()
+        if not watcher.supported:
+            while not template.matches(timeout=0):
+                sleep(poll_frequency)
+                if -1 < timeout < time() - t1:
+                    raise TimeoutException(f'No match for {template.__class__.__name__} found in {timeout} seconds.')
+            watcher.find()
+        else:
+            BrowsingContext.of(template.driver).enter(())
+            while True:
+                budget = WATCH_BUDGET if timeout < 0 else max(0, min(WATCH_BUDGET, timeout - (time() - t1)))
+                response = watcher.watch(template.driver, budget, poll_frequency)
+                if response is not None and 'error' not in response:
+                    watcher.store(response)
+                    break
+                if response is not None:
+                    # The script could not find the Locators, find them the usual way.
+                    watcher.find()
+                    break
+                if -1 < timeout < time() - t1:
+                    raise TimeoutException(f'No match for {template.__class__.__name__} found in {timeout} seconds.')
+        print(f'Page matches {template.__class__.__name__}!')
+        if template is self.matcher:
+            self.snapshot('wait_for_match')
         return self
 
     def wait_until_match_and_ready(self, *args, **kwargs):
@@ -626,8 +1259,9 @@ class Page(object):
         :param timeout:
         """
         print(f'Waiting for page to no longer match {self.__class__.__name__}')
+        self.matcher.discard_prefetched()
         t1 = time()
-        while self.matches(timeout=0):
+        while self.matches(timeout=0, capture=False):
             sleep(poll_frequency)
             if -1 < timeout < time() - t1:
                 raise TimeoutException(f"Page continued to match {self.__class__.__name__} for {timeout} seconds.")
@@ -642,7 +1276,10 @@ class Page(object):
         :param poll_frequency:
         :return:
         """
+        from selenium.webdriver.support.wait import WebDriverWait
+
         print(f'{self.__class__.__name__} - Waiting until DOM is ready.')
+        BrowsingContext.of(self.matcher.driver).enter(())
         sleep(1)
         WebDriverWait(self.matcher.driver, timeout, poll_frequency).until(
             lambda driver: driver.execute_script('return document.readyState') == 'complete'
@@ -663,7 +1300,10 @@ class Page(object):
         :param poll_frequency:
         :return:
         """
+        from selenium.webdriver.support.wait import WebDriverWait
+
         print(f'Waiting for "{element.name}" to be found by "{element.by}": "{element.locator}", to meet {expected_condition}')
+        BrowsingContext.of(self.matcher.driver).enter(element.frames)
         WebDriverWait(self.matcher.driver, timeout if timeout else 0.1, poll_frequency).until(
             expected_condition((element.by, element.locator))
         )
@@ -0,0 +1,131 @@
+"""
+Measure how long a fresh python interpreter takes to get from startup to the
+first `Locator.find()`.
+
+Every run starts a new interpreter, imports selentric, builds a
+`PageTemplate` and `Page`, and finds one element.  By default the element is
+found with a stub driver, so only selentric's own overhead is measured.  Pass
+`--driver module:function` to start a real web driver instead; starting the
+driver is then reported on its own.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --max-ms 50
+    python benchmarks/startup.py --driver my_drivers:headless_chrome
+
+With `--max-ms` the script exits with status 1 if the median time spent in
+selentric (import, template, first find) is over the limit.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+from time import perf_counter
+started = perf_counter()
+import importlib.util, json, sys
+
+spec = importlib.util.spec_from_file_location(
+    'selentric', {init!r}, submodule_search_locations=[{root!r}]
+)
+selentric = importlib.util.module_from_spec(spec)
+sys.modules['selentric'] = selentric
+spec.loader.exec_module(selentric)
+imported = perf_counter()
+
+driver_path = {driver!r}
+if driver_path:
+    module_name, _, function = driver_path.partition(':')
+    driver = getattr(importlib.import_module(module_name), function)()
+else:
+    class StubDriver(object):
+        def find_element(self, by, value):
+            return object()
+
+        def find_elements(self, by, value):
+            return [object()]
+
+    driver = StubDriver()
+driver_started = perf_counter()
+
+
+class StartupTemplate(selentric.PageTemplate):
+    def __init__(self, driver):
+        super(StartupTemplate, self).__init__(driver)
+        self.match_partial_url('index.php')
+        self.match_partial_title('Search')
+        self.match_presence(selentric.Locator(selentric.By.NAME, 'search', name='search_input'))
+        self.match_presence(selentric.Locator(selentric.By.CLASS_NAME, 'mw-advancedSearch-container'))
+        results = selentric.Locator(selentric.By.CLASS_NAME, 'mw-search-results')
+        self.add_locator(selentric.Locator(selentric.By.TAG_NAME, 'li', name='search_results', parent=results, multiple=True))
+
+
+page = selentric.Page(StartupTemplate(driver), driver)
+built = perf_counter()
+page.locator('search_input').find()
+found = perf_counter()
+
+if driver_path:
+    driver.quit()
+print(json.dumps({{
+    'import': imported - started,
+    'driver': driver_started - imported,
+    'template': built - driver_started,
+    'first_find': found - built,
+}}))
+"""
+
+
+def run(code: str):
+    """
+    Run the code in a new interpreter and time it.
+
+    :param code:
+    :return tuple: wall time and the JSON the code printed, if any
+    """
+    started = perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    elapsed = perf_counter() - started
+    return elapsed, json.loads(output) if output.strip() else None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark interpreter startup to the first Locator.find().')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--driver', default='', help='module:function that starts a web driver')
+    parser.add_argument('--max-ms', type=float, help='fail if the median selentric time is over this many milliseconds')
+    options = parser.parse_args(args)
+
+    code = CHILD.format(init=os.path.join(ROOT, '__init__.py'), root=ROOT, driver=options.driver)
+    interpreter = [run('pass')[0] for _ in range(options.runs)]
+    totals, phases = [], []
+    for _ in range(options.runs):
+        total, phase = run(code)
+        totals.append(total)
+        phases.append(phase)
+
+    def median_ms(values):
+        return statistics.median(values) * 1000
+
+    selentric = [p['import'] + p['template'] + p['first_find'] for p in phases]
+    print(f'runs:              {options.runs}')
+    print(f'interpreter:       {median_ms(interpreter):8.2f} ms')
+    print(f'total:             {median_ms(totals):8.2f} ms')
+    for name in ('import', 'driver', 'template', 'first_find'):
+        print(f'  {name + ":":16} {median_ms([p[name] for p in phases]):8.2f} ms')
+    print(f'selentric:         {median_ms(selentric):8.2f} ms')
+
+    if options.max_ms is not None and median_ms(selentric) > options.max_ms:
+        print(f'Over the {options.max_ms} ms limit.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+import argparse
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, parse_qsl
+
+from . import Page, PageTemplate
+
+
+# Relative cost of evaluating each kind of condition.  URL and title checks
+# don't touch the DOM, ids and names are indexed lookups, class names are not.
+COSTS = {
+    'url': 1,
+    'title': 1,
+    'partial_title': 1,
+    'id': 2,
+    'name': 3,
+    'class': 4,
+}
+
+# Tags worth adding as named Locators so controllers can interact with them.
+INTERACTIVE_TAGS = {'a', 'button', 'input', 'select', 'textarea', 'form'}
+
+TITLE_SEPARATORS = re.compile(r'\s+[-|–—:]\s+')
+
+# Locators become attributes of the template, and are looked up through the
+# `Page`, so they can't share a name with anything either of them has.
+RESERVED_NAMES = set(dir(PageTemplate())) | set(dir(Page(PageTemplate(), None)))
+
+
+class _FeatureParser(HTMLParser):
+    """
+    Collect the id, name and class attributes, and the title, of an HTML
+    document.  No tree is built, so large documents parse quickly.
+    """
+    def __init__(self):
+        super(_FeatureParser, self).__init__(convert_charrefs=True)
+        self.counts = {}
+        self.interactive = set()
+        self.title = None
+        self._title_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        for attribute, value in attrs:
+            if not value:
+                continue
+            if attribute == 'class':
+                for class_name in set(value.split()):
+                    self._count(('class', class_name), tag)
+            elif attribute in ('id', 'name'):
+                self._count((attribute, value.strip()), tag)
+        if tag == 'title' and self.title is None:
+            self._title_parts = []
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._title_parts is not None:
+            self.title = ' '.join(''.join(self._title_parts).split())
+            self._title_parts = None
+
+    def _count(self, feature, tag):
+        self.counts[feature] = self.counts.get(feature, 0) + 1
+        if tag in INTERACTIVE_TAGS:
+            self.interactive.add(feature)
+
+
+def extract_features(html: str, url: str = None, title: str = None):
+    """
+    Get the conditions a page source could be matched by.
+
+    Returns a tuple of the set of features found in the document, and the set
+    of features that belong to a single interactive element (inputs, buttons,
+    links, etc.).  A feature is a `(kind, value)` tuple where `kind` is one
+    of the keys in `COSTS`.
+
+    :param html:
+    :param url:
+    :param title: overrides the title found in the document
+    :return tuple:
+    """
+    parser = _FeatureParser()
+    parser.feed(html)
+    parser.close()
+
+    features = set(parser.counts)
+    unique = {feature for feature in parser.interactive if parser.counts[feature] == 1}
+
+    title = parser.title if title is None else title
+    if title:
+        features.add(('title', title))
+        for part in TITLE_SEPARATORS.split(title):
+            if len(part) > 1 and part != title:
+                features.add(('partial_title', part))
+
+    if url:
+        parsed = urlsplit(url)
+        if parsed.netloc:
+            features.add(('url', parsed.netloc))
+        if parsed.path and parsed.path != '/':
+            features.add(('url', parsed.path))
+            for segment in parsed.path.split('/'):
+                # Single characters are found in almost any URL.
+                if len(segment) > 1:
+                    features.add(('url', segment))
+        for key, _ in parse_qsl(parsed.query, keep_blank_values=True):
+            features.add(('url', f'{key}='))
+
+    return features, unique
+
+
+def _popcount(mask: int):
+    return bin(mask).count('1')
+
+
+class TemplateGenerator(object):
+    """
+    Collect page sources for several page types and generate `PageTemplate`
+    code that tells them apart.
+
+    For each page type the generator picks the cheapest set of conditions (URL
+    and title fragments first, then element ids, names and class names) that
+    every page of that type meets, and that together rule out every page of
+    the other types.  The conditions are written out cheapest first, since
+    `PageTemplate.matches` stops at the first condition that isn't met.
+
+    Every document is given a bit in an integer bitmask, and the generator
+    keeps an index of which documents each feature was seen in.  Picking
+    conditions is then done with bitwise operations on the index instead of
+    re-reading the documents, so large collections of page sources stay fast.
+
+    URL and partial title conditions are checked with a substring test by
+    `PageTemplate`, so a page is only ruled out by one of them if the value
+    isn't found anywhere in that page's URL or title.
+
+    Basic Example:
+        generator = TemplateGenerator()
+        generator.add_file('WikipediaSearch', 'captured/search.html', url='https://en.wikipedia.org/w/index.php?search=')
+        generator.add_file('WikipediaSignIn', 'captured/login.html')
+        print(generator.render())
+
+    Snapshots written by a `selentric.snapshots.SnapshotWriter` can be added
+    with `add_archive`.  They already know their page type, URL and title.
+
+    From the command line:
+        python -m selentric.generator --page WikipediaSearch search.html --page WikipediaSignIn login.html
+    """
+    def __init__(self):
+        self.page_types = {}
+        self.index = {}
+        self.unique = {}
+        self.documents = 0
+        self.urls = []
+        self.titles = []
+
+    def add_html(self, page_type: str, html: str, url: str = None, title: str = None):
+        """
+        Add a page source for the given page type.
+
+        :param page_type: name of the `PageTemplate` class to generate
+        :param html:
+        :param url: URL the page source was captured from, if known
+        :param title: title of the page, if it differs from the document's title
+        :return:
+        """
+        features, unique = extract_features(html, url, title)
+        bit = 1 << self.documents
+        self.documents += 1
+        self.urls.append(url)
+        self.titles.append(next((value for kind, value in features if kind == 'title'), ''))
+        self.page_types[page_type] = self.page_types.get(page_type, 0) | bit
+        for feature in features:
+            self.index[feature] = self.index.get(feature, 0) | bit
+        for feature in unique:
+            self.unique[feature] = self.unique.get(feature, 0) | bit
+        return self
+
+    def add_file(self, page_type: str, path: str, url: str = None, encoding='utf-8'):
+        """
+        Add a page source saved to a file.
+
+        :param page_type:
+        :param path:
+        :param url:
+        :param encoding:
+        :return:
+        """
+        with open(path, encoding=encoding, errors='replace') as f:
+            return self.add_html(page_type, f.read(), url)
+
+    def add_archive(self, archive):
+        """
+        Add every page source from a `selentric.snapshots.SnapshotArchive`,
+        using the name of the `Page` that captured it as the page type.
+
+        :param archive:
+        :return:
+        """
+        for snapshot in archive:
+            self.add_html(snapshot['page'], archive.source(snapshot), snapshot.get('url'), snapshot.get('title'))
+        return self
+
+    def conditions(self, page_type: str):
+        """
+        Pick the conditions for a page type.
+
+        Only features found in every document of the page type are considered.
+        Conditions are picked greedily by how many documents of other page
+        types they rule out per unit of cost, then any condition made
+        redundant by later picks is dropped.
+
+        Returns the conditions cheapest first, and a bitmask of the documents
+        of other page types that the conditions could not rule out.
+
+        :param page_type:
+        :return tuple:
+        """
+        mask = self.page_types[page_type]
+        others = ((1 << self.documents) - 1) & ~mask
+        candidates = {
+            feature: others & ~present
+            for feature, present in self.index.items()
+            if present & mask == mask
+        }
+        for feature in candidates:
+            if feature[0] in ('url', 'partial_title'):
+                candidates[feature] = self._without_substring_matches(feature, candidates[feature])
+        if not candidates:
+            return [], others
+
+        chosen = []
+        remaining = others
+        while remaining:
+            feature = max(candidates, key=lambda f: (_popcount(candidates[f] & remaining) / COSTS[f[0]], -COSTS[f[0]], f))
+            if not candidates[feature] & remaining:
+                break
+            chosen.append(feature)
+            remaining &= ~candidates[feature]
+
+        for feature in list(reversed(chosen)):
+            rest = [f for f in chosen if f != feature]
+            covered = 0
+            for f in rest:
+                covered |= candidates[f]
+            if rest and (covered & others) == (others & ~remaining):
+                chosen = rest
+
+        if not chosen:
+            # Nothing to rule out, so take the cheapest condition.
+            chosen = [min(candidates, key=lambda f: (COSTS[f[0]], f))]
+
+        chosen.sort(key=lambda f: (COSTS[f[0]], -_popcount(candidates[f]), f))
+        return chosen, remaining
+
+    def _without_substring_matches(self, feature: tuple, mask: int):
+        """
+        Remove the documents whose URL or title contains the feature's value
+        from the bitmask.  Documents with an unknown URL are removed too, since
+        a URL condition can't be shown to rule them out.
+
+        :param feature:
+        :param mask:
+        :return int:
+        """
+        kind, value = feature
+        texts = self.urls if kind == 'url' else self.titles
+        result = mask
+        while mask:
+            bit = mask & -mask
+            text = texts[bit.bit_length() - 1]
+            if text is None or value in text:
+                result &= ~bit
+            mask &= ~bit
+        return result
+
+    def locators(self, page_type: str):
+        """
+        Get the interactive elements found exactly once in every document of
+        the page type.  These are added as named Locators.
+
+        :param page_type:
+        :return list:
+        """
+        mask = self.page_types[page_type]
+        return sorted(
+            feature for feature, present in self.unique.items()
+            if present & mask == mask and feature[0] in ('id', 'name')
+        )
+
+    def render(self):
+        """
+        Generate the source code of a module with a `PageTemplate` for every
+        page type.
+
+        :return str:
+        """
+        lines = ['from selentric import PageTemplate, Locator, By']
+        for page_type in self.page_types:
+            lines.extend(['', ''])
+            lines.extend(self.render_template(page_type))
+        return '\n'.join(lines) + '\n'
+
+    def render_template(self, page_type: str):
+        """
+        Generate the source code lines of a `PageTemplate` for the page type.
+
+        :param page_type:
+        :return list:
+        """
+        class_name = _class_name(page_type)
+        conditions, remaining = self.conditions(page_type)
+        locators = self.locators(page_type)
+        names = {}
+        for feature in locators:
+            name = _attribute_name(feature[1])
+            while name in names.values() or name in RESERVED_NAMES:
+                name += '_'
+            names[feature] = name
+
+        lines = [
+            f'class {class_name}(PageTemplate):',
+            '    def __init__(self, driver):',
+            f'        super({class_name}, self).__init__(driver)',
+            '',
+        ]
+        if remaining:
+            lines.append(f'        # Could not be told apart from {_popcount(remaining)} page(s) of other page types.')
+        for kind, value in conditions:
+            if kind == 'url':
+                lines.append(f'        self.match_partial_url({value!r})')
+            elif kind == 'title':
+                lines.append(f'        self.match_title({value!r})')
+            elif kind == 'partial_title':
+                lines.append(f'        self.match_partial_title({value!r})')
+            else:
+                name = f', name={names[(kind, value)]!r}' if (kind, value) in names else ''
+                lines.append(f'        self.match_presence(Locator({_BY[kind]}, {value!r}{name}))')
+        for feature in locators:
+            if feature not in conditions:
+                lines.append(f'        self.add_locator(Locator({_BY[feature[0]]}, {feature[1]!r}, name={names[feature]!r}))')
+        return lines
+
+
+_BY = {'id': 'By.ID', 'name': 'By.NAME', 'class': 'By.CLASS_NAME'}
+
+
+def _class_name(page_type: str):
+    words = re.split(r'[^0-9a-zA-Z]+', page_type)
+    name = ''.join(word[:1].upper() + word[1:] for word in words if word)
+    if not name or name[0].isdigit():
+        name = 'Page' + name
+    return name
+
+
+def _attribute_name(value: str):
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', value)
+    name = re.sub(r'[^0-9a-zA-Z]+', '_', name).strip('_').lower()
+    if not name or name[0].isdigit():
+        name = 'element_' + name
+    return name
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Generate PageTemplates from captured page sources.')
+    parser.add_argument('--page', nargs='+', action='append', default=[], metavar=('PAGE_TYPE', 'FILE'),
+                        help='page type followed by the HTML files captured for it')
+    parser.add_argument('--archive', action='append', default=[],
+                        help='directory written by a SnapshotWriter')
+    parser.add_argument('-o', '--output', help='file to write the generated module to')
+    options = parser.parse_args(args)
+
+    generator = TemplateGenerator()
+    for page_type, *paths in options.page:
+        for path in paths:
+            generator.add_file(page_type, path)
+    if options.archive:
+        from .snapshots import SnapshotArchive
+        for path in options.archive:
+            generator.add_archive(SnapshotArchive(path))
+    if not generator.page_types:
+        parser.error('give at least one --page or --archive')
+
+    source = generator.render()
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            f.write(source)
+    else:
+        print(source, end='')
+
+
+if __name__ == '__main__':
+    main()
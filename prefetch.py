@@ -0,0 +1,290 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.common.exceptions import (
+    JavascriptException, NoSuchElementException, NoSuchFrameException, StaleElementReferenceException, TimeoutException
+)
+
+from . import BrowsingContext, Locator, batch_by_frame
+
+
+# Script run with `execute_async_script`.  It waits in the browser until every
+# condition of the template is met, then finds the requested elements and
+# reads their properties before returning, so matching the template and
+# reading the page only takes one round trip.  Returns null if the conditions
+# weren't met within the time budget.
+WATCH_SCRIPT = """
+var conditions = arguments[0], locators = arguments[1], properties = arguments[2];
+var deadline = Date.now() + arguments[3], pollFrequency = arguments[4];
+var done = arguments[arguments.length - 1];
+
+function find(context, by, value, all) {
+    if (by === 'xpath') {
+        var snapshot = (context.ownerDocument || document).evaluate(value, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var nodes = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+        return all ? nodes : (nodes[0] || null);
+    }
+    if (by === 'link text' || by === 'partial link text') {
+        var links = Array.prototype.filter.call(context.querySelectorAll('a'), function (link) {
+            var text = link.innerText.trim();
+            return by === 'link text' ? text === value : text.indexOf(value) >= 0;
+        });
+        return all ? links : (links[0] || null);
+    }
+    var selector = {
+        'id': '#' + CSS.escape(value),
+        'name': '[name="' + CSS.escape(value) + '"]',
+        'class name': '.' + CSS.escape(value),
+        'tag name': value,
+        'css selector': value
+    }[by];
+    return all ? Array.prototype.slice.call(context.querySelectorAll(selector)) : context.querySelector(selector);
+}
+
+function visible(element) {
+    if (!element) return false;
+    var style = window.getComputedStyle(element);
+    return style.display !== 'none' && style.visibility !== 'hidden' && element.getClientRects().length > 0;
+}
+
+function check(condition) {
+    var kind = condition[0], value = condition[1];
+    if (kind === 'url_contains') return location.href.indexOf(value) >= 0;
+    if (kind === 'url_matches') return new RegExp(value).test(location.href);
+    if (kind === 'title_is') return document.title === value;
+    if (kind === 'title_contains') return document.title.indexOf(value) >= 0;
+    var element = find(document, value[0], value[1], false);
+    if (kind === 'presence') return !!element;
+    if (kind === 'visibility') return visible(element);
+    if (kind === 'invisibility') return !visible(element);
+    if (kind === 'clickable') return visible(element) && !element.disabled;
+    if (kind === 'disabled') return !!element && !!element.disabled;
+    if (kind === 'text') return !!element && element.innerText.indexOf(condition[2]) >= 0;
+    if (kind === 'value_text') return !!element && (attribute(element, 'value') || '').indexOf(condition[2]) >= 0;
+    return false;
+}
+
+// Read a property the way selenium's `get_attribute` does: the element's
+// property if it has one, otherwise the attribute.
+var ALIASES = {'class': 'className', 'readonly': 'readOnly'};
+function attribute(element, name) {
+    if (name === 'style') return element.style.cssText;
+    var value = element[ALIASES[name] || name];
+    if (typeof value === 'boolean') return value ? 'true' : null;
+    if (typeof value === 'string' || typeof value === 'number') return String(value);
+    return element.getAttribute(name);
+}
+
+function read(element) {
+    var values = {};
+    properties.forEach(function (property) {
+        values[property] = property === 'text' ? element.innerText : attribute(element, property);
+    });
+    return values;
+}
+
+function resolve() {
+    var elements = [], values = [];
+    locators.forEach(function (locator) {
+        var context = document;
+        if (locator.parent >= 0) {
+            context = elements[locator.parent];
+            if (context && locator.shadowRoot) context = context.shadowRoot;
+        }
+        var result = context ? find(context, locator.by, locator.value, locator.multiple) : null;
+        elements.push(result);
+        values.push(result === null ? null : locator.multiple ? result.map(read) : read(result));
+    });
+    return {elements: elements, properties: values};
+}
+
+var finished = false, observer, timer;
+function finish(value) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(timer);
+    done(value);
+}
+function tick() {
+    if (finished) return;
+    var matched = false;
+    try {
+        matched = conditions.every(check);
+    } catch (e) {}
+    if (matched) {
+        try {
+            finish(resolve());
+        } catch (e) {
+            finish({error: String(e)});
+        }
+    } else if (Date.now() >= deadline) {
+        finish(null);
+    }
+}
+observer = new MutationObserver(tick);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+timer = setInterval(tick, pollFrequency);
+tick();
+"""
+
+# Expected conditions the script can check, by function name.  Templates
+# hold selentric's lazy stand-ins for selenium's functions, so they are
+# matched by name rather than identity.
+CONDITION_KINDS = {
+    'url_contains': 'url_contains',
+    'url_matches': 'url_matches',
+    'title_is': 'title_is',
+    'title_contains': 'title_contains',
+    'presence_of_element_located': 'presence',
+    'visibility_of_element_located': 'visibility',
+    'invisibility_of_element_located': 'invisibility',
+    'element_to_be_clickable': 'clickable',
+    'text_to_be_present_in_element': 'text',
+    'text_to_be_present_in_element_value': 'value_text',
+    'element_is_disabled': 'disabled',
+}
+
+BY_VALUES = {By.ID, By.NAME, By.CLASS_NAME, By.TAG_NAME, By.CSS_SELECTOR, By.XPATH, By.LINK_TEXT, By.PARTIAL_LINK_TEXT}
+
+# Seconds the browser waits before handing control back to python.  Kept well
+# under selenium's default 30 second script timeout.
+WATCH_BUDGET = 5
+
+
+class PrefetchedElement(WebElement):
+    """
+    A selenium web element that already knows some of its properties.
+
+    `text` and `get_attribute` return the values read by the watcher when the
+    page matched, without another round trip to the browser.  Like selenium's
+    `get_attribute`, the watcher reads the element's property (e.g. the current
+    `value` of an input) and falls back to the HTML attribute.  Anything else
+    goes to the browser as usual.  The values are not updated if the page
+    changes afterwards.
+    """
+    def __init__(self, element: WebElement, properties: dict):
+        super(PrefetchedElement, self).__init__(element.parent, element.id)
+        self.prefetched = properties
+
+    @property
+    def text(self):
+        if 'text' in self.prefetched:
+            return self.prefetched['text']
+        return super(PrefetchedElement, self).text
+
+    def get_attribute(self, name):
+        if name != 'text' and name in self.prefetched:
+            return self.prefetched[name]
+        return super(PrefetchedElement, self).get_attribute(name)
+
+
+class TemplateWatcher(object):
+    """
+    Translate a `PageTemplate`'s conditions, and the `Locator`s to read once
+    it matches, into arguments for `WATCH_SCRIPT`.
+
+    Not everything can be checked from inside the page.  If the template
+    waits for an alert, uses custom expected conditions, or any Locator
+    lives inside of an iframe, `supported` is False and the caller should
+    fall back to matching the usual way and calling `find`.
+    """
+    def __init__(self, template, names, properties=('text',)):
+        self.template = template
+        self.names = names
+        self.properties = list(properties)
+        self.supported = True
+        self.conditions = [self._condition(condition) for condition in template.expected_conditions]
+        self.locators = []
+        self.chain = []
+        self.indexes = [self._locator(template.locators[name]) for name in names]
+
+    def _condition(self, condition):
+        kind = CONDITION_KINDS.get(getattr(condition[0], '__name__', None))
+        if kind is None or (len(condition) > 2 and (condition[2].frames or condition[2].shadow_root)):
+            self.supported = False
+            return None
+        args = condition[1]
+        if kind.startswith(('url', 'title')):
+            return [kind, args[0]]
+        if args[0][0] not in BY_VALUES:
+            self.supported = False
+            return None
+        return [kind, list(args[0])] + list(args[1:])
+
+    def _locator(self, locator):
+        """
+        Add the Locator, and its parent Locators, to the list of Locators the
+        script resolves.  Returns the Locator's index in that list.
+        """
+        for index, known in enumerate(self.chain):
+            if known is locator:
+                return index
+        parent = -1 if locator.parent is None else self._locator(locator.parent)
+        if locator.frames or locator.by not in BY_VALUES:
+            self.supported = False
+        self.chain.append(locator)
+        self.locators.append({
+            'by': locator.by,
+            'value': locator.locator,
+            'multiple': locator.multiple,
+            'parent': parent,
+            'shadowRoot': locator.shadow_root,
+        })
+        return len(self.chain) - 1
+
+    def watch(self, driver, budget: float, poll_frequency: float):
+        """
+        Run the watch script once.  Returns None if the template didn't match
+        within `budget` seconds.
+
+        :param driver:
+        :param budget:
+        :param poll_frequency:
+        :return dict:
+        """
+        try:
+            return driver.execute_async_script(
+                WATCH_SCRIPT, self.conditions, self.locators, self.properties,
+                int(budget * 1000), max(int(poll_frequency * 1000), 10)
+            )
+        except (JavascriptException, TimeoutException):
+            # The page navigated away while the script was waiting.
+            return None
+
+    def store(self, response: dict):
+        """
+        Hand the elements found by the script to their Locators.  The next
+        `find` on each Locator uses them instead of asking the browser.
+
+        :param response:
+        :return:
+        """
+        for index in self.indexes:
+            locator = self.chain[index]
+            elements = response['elements'][index]
+            properties = response['properties'][index]
+            if elements is None:
+                continue
+            if locator.multiple:
+                locator.prefetched = [PrefetchedElement(e, p) for e, p in zip(elements, properties)]
+            else:
+                locator.prefetched = PrefetchedElement(elements, properties)
+
+    def find(self):
+        """
+        Find the Locators the usual way, for templates the script can't check
+        or when the script fails, and hand the web elements to the Locators
+        like `store` does.  Locators that can't be found are skipped.
+
+        :return:
+        """
+        locators = self.template.locators
+        current = BrowsingContext.of(self.template.driver).path
+        for name in batch_by_frame(self.names, lambda name: locators[name].frames, current):
+            locator = locators[name]
+            driver = Locator.driver if locator.driver is None else locator.driver
+            try:
+                locator.prefetched = locator._find(driver)
+            except (NoSuchElementException, NoSuchFrameException, StaleElementReferenceException):
+                continue
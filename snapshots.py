@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from time import time
+
+
+# Read the page source, URL and title in one round trip.
+CAPTURE_SCRIPT = """
+var doctype = document.doctype ? new XMLSerializer().serializeToString(document.doctype) : '';
+return [doctype + document.documentElement.outerHTML, location.href, document.title];
+"""
+
+
+class SnapshotWriter(object):
+    """
+    This object captures the page source (and optionally a screenshot) of the
+    current web page and writes it to disk on a background thread, so the
+    automation code only pays for the selenium round trips needed to read the
+    page.  Hashing, compressing and writing all happen on the writer thread.
+
+    Snapshots are written to an append-only archive directory.  Every page
+    source and screenshot is stored once under its content hash in the
+    `objects` folder, and every capture appends a line to `index.jsonl`
+    pointing at those objects.  Capturing the same page twice only costs an
+    index line.
+
+    The amount of UTF-8 encoded page source (and screenshots) waiting to be
+    written is capped by `max_pending_bytes`.  When the cap is reached `capture` waits for the
+    writer to catch up, or drops the snapshot if `block` is `False`.
+
+    Basic Example:
+        writer = SnapshotWriter('snapshots/', screenshots=True)
+        wiki_search = WikipediaSearch(driver).capture_snapshots(writer)
+
+        # Every time `wait_for_match` succeeds a snapshot is captured.
+        wiki_search.search('Red Panda')
+
+        writer.close()
+    """
+    def __init__(self, path: str, screenshots=False, max_pending_bytes=32 * 1024 * 1024, block=True, compresslevel=6):
+        """
+        :param path: directory to write the archive to
+        :param screenshots: also capture a PNG screenshot with every page source
+        :param max_pending_bytes: cap on the size of snapshots waiting to be written
+        :param block: wait for room in the queue instead of dropping snapshots
+        :param compresslevel: gzip compression level used for page sources
+        """
+        self.path = path
+        self.screenshots = screenshots
+        self.max_pending_bytes = max_pending_bytes
+        self.block = block
+        self.compresslevel = compresslevel
+
+        self.written = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._pending = deque()
+        self._pending_bytes = 0
+        self._unfinished = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._known = set()
+
+        os.makedirs(os.path.join(path, 'objects'), exist_ok=True)
+        self._index = open(os.path.join(path, 'index.jsonl'), 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='selentric-snapshots', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def capture(self, driver, **info):
+        """
+        Read the page source (and screenshot, if enabled) from the driver and
+        queue it to be written.  The page source, URL and title are read with
+        a single script.  Any keyword arguments are stored in the index along
+        with the snapshot.
+
+        Returns False if the snapshot was dropped.
+
+        :param driver:
+        :param info:
+        :return bool:
+        """
+        source, url, title = driver.execute_script(CAPTURE_SCRIPT)
+        screenshot = driver.get_screenshot_as_png() if self.screenshots else None
+        return self.submit(source, screenshot, url=url, title=title, **info)
+
+    def submit(self, source: str, screenshot: bytes = None, **info):
+        """
+        Queue a page source and optional PNG screenshot to be written.  The
+        page source is encoded right away, so the queue is capped by the
+        bytes it actually holds.
+
+        Returns False if the snapshot was dropped.
+
+        :param source:
+        :param screenshot:
+        :param info:
+        :return bool:
+        """
+        source = source.encode('utf-8')
+        size = len(source) + (len(screenshot) if screenshot else 0)
+        info['time'] = time()
+        with self._condition:
+            if self._closed:
+                raise ValueError('Cannot capture snapshots with a closed SnapshotWriter.')
+            # A snapshot larger than the cap is still let through once the
+            # queue is empty, otherwise it would wait forever.
+            while self._pending and self._pending_bytes + size > self.max_pending_bytes:
+                if not self.block:
+                    self.dropped += 1
+                    return False
+                self._condition.wait()
+            self._pending.append((source, screenshot, info, size))
+            self._pending_bytes += size
+            self._unfinished += 1
+            self._condition.notify_all()
+        return True
+
+    def record_error(self, error: Exception):
+        """
+        Count an error raised while capturing or writing a snapshot.
+
+        :param error:
+        :return:
+        """
+        with self._condition:
+            self.errors += 1
+            self.last_error = error
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued snapshot has been written.
+
+        Returns False if the timeout ran out first.
+
+        :param timeout:
+        :return bool:
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._unfinished, timeout)
+
+    def close(self):
+        """
+        Write any queued snapshots and stop the writer thread.
+
+        :return:
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._index.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                source, screenshot, info, size = self._pending.popleft()
+            try:
+                self._write(source, screenshot, info)
+            except Exception as e:
+                self.record_error(e)
+            with self._condition:
+                self._pending_bytes -= size
+                self._unfinished -= 1
+                self._condition.notify_all()
+
+    def _write(self, source, screenshot, info):
+        info['source'] = self._store(source, '.html.gz', compress=True)
+        info['screenshot'] = self._store(screenshot, '.png') if screenshot else None
+        self._index.write(json.dumps(info) + '\n')
+        self._index.flush()
+        self.written += 1
+
+    def _store(self, data: bytes, extension: str, compress=False):
+        """
+        Store the data under its content hash, unless it's already stored.
+
+        :return str: content hash
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        filename = object_path(self.path, digest, extension)
+        if digest in self._known or os.path.exists(filename):
+            self._known.add(digest)
+            self.deduplicated += 1
+            return digest
+        if compress:
+            data = gzip.compress(data, self.compresslevel, mtime=0)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temp_filename = f'{filename}.{threading.get_ident()}.tmp'
+        with open(temp_filename, 'wb') as f:
+            f.write(data)
+        os.replace(temp_filename, filename)
+        self._known.add(digest)
+        return digest
+
+
+class SnapshotArchive(object):
+    """
+    Read the snapshots written by a `SnapshotWriter`.
+
+    Basic Example:
+        archive = SnapshotArchive('snapshots/')
+        for snapshot in archive:
+            if snapshot['page'] == 'WikipediaSearch':
+                html = archive.source(snapshot)
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self):
+        """
+        Iterate over the index entries, oldest first.
+
+        :return:
+        """
+        index = os.path.join(self.path, 'index.jsonl')
+        if not os.path.exists(index):
+            return
+        with open(index, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def source(self, snapshot: dict):
+        """
+        Get the page source stored for an index entry.
+
+        :param snapshot:
+        :return str:
+        """
+        with open(object_path(self.path, snapshot['source'], '.html.gz'), 'rb') as f:
+            return gzip.decompress(f.read()).decode('utf-8')
+
+    def screenshot(self, snapshot: dict):
+        """
+        Get the PNG screenshot stored for an index entry, or None if there
+        is no screenshot.
+
+        :param snapshot:
+        :return bytes:
+        """
+        if not snapshot.get('screenshot'):
+            return None
+        with open(object_path(self.path, snapshot['screenshot'], '.png'), 'rb') as f:
+            return f.read()
+
+
+def object_path(path: str, digest: str, extension: str):
+    """
+    Get the filename an archive object is stored under.
+
+    :param path:
+    :param digest:
+    :param extension:
+    :return str:
+    """
+    return os.path.join(path, 'objects', digest[:2], digest + extension)
@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The repository is the package itself, so load it under its package name.
+if 'selentric' not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        'selentric', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT]
+    )
+    selentric = importlib.util.module_from_spec(spec)
+    sys.modules['selentric'] = selentric
+    spec.loader.exec_module(selentric)
@@ -0,0 +1,158 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+from selentric import BrowsingContext, By, Locator, PageTemplate, batch_by_frame
+
+
+class StubElement(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class StubSwitchTo(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def default_content(self):
+        self.driver.log.append('default')
+        self.driver.frame = ()
+
+    def parent_frame(self):
+        self.driver.log.append('parent')
+        self.driver.frame = self.driver.frame[:-1]
+
+    def frame(self, frame):
+        name = frame.name if isinstance(frame, StubElement) else frame
+        self.driver.log.append(('frame', name))
+        self.driver.frame = self.driver.frame + (name,)
+
+
+class StubDriver(object):
+    """
+    Records frame switches and lookups.  Elements listed in `frames` can
+    only be found while the driver is switched into that frame.
+    """
+    def __init__(self, frames=None):
+        self.log = []
+        self.frame = ()
+        self.frames = frames or {}
+        self.switch_to = StubSwitchTo(self)
+
+    def find_element(self, by, value):
+        self.log.append(('find', value))
+        if self.frames.get(value, self.frame) != self.frame:
+            raise NoSuchElementException(value)
+        return StubElement(value)
+
+    def find_elements(self, by, value):
+        return [self.find_element(by, value)]
+
+    def navigate(self):
+        self.frame = ()
+
+
+def switches(driver):
+    return [entry for entry in driver.log if entry[0] != 'find']
+
+
+def test_enter_only_switches_the_frames_that_differ():
+    driver = StubDriver()
+    context = BrowsingContext.of(driver)
+
+    assert context.enter(('A', 'B'))
+    assert context.enter(('A', 'C'))
+    assert context.enter(())
+    assert context.enter(('A',))
+    assert not context.enter(('A',))
+    assert switches(driver) == [
+        ('frame', 'A'), ('frame', 'B'),
+        'parent', ('frame', 'C'),
+        'default',
+        ('frame', 'A'),
+    ]
+    assert driver.frame == ('A',)
+
+
+def test_enter_starts_from_the_top_level_document_after_invalidate():
+    driver = StubDriver()
+    context = BrowsingContext.of(driver)
+    context.enter(('A',))
+    driver.log.clear()
+
+    context.invalidate().enter(('A', 'B'))
+    assert switches(driver) == ['default', ('frame', 'A'), ('frame', 'B')]
+
+
+def test_enter_finds_frame_locators_and_forgets_the_path_on_failure():
+    driver = StubDriver(frames={'missing': ('nowhere',)})
+    context = BrowsingContext.of(driver)
+
+    context.enter((Locator(By.ID, 'outer'),))
+    assert driver.frame == ('outer',)
+
+    with pytest.raises(NoSuchElementException):
+        context.enter((Locator(By.ID, 'outer'), Locator(By.ID, 'missing')))
+    assert context.path is None
+
+
+def test_locator_retries_from_the_top_level_document_after_navigation():
+    driver = StubDriver(frames={'body': ('A',)})
+    locator = Locator(By.ID, 'body', driver=driver, frame='A')
+    assert locator.find().name == 'body'
+
+    # Navigating drops the driver back to the top-level document without
+    # the BrowsingContext knowing about it.
+    driver.navigate()
+    driver.log.clear()
+    assert locator.find().name == 'body'
+    assert driver.log == [('find', 'body'), 'default', ('frame', 'A'), ('find', 'body')]
+
+
+def test_locator_does_not_retry_after_switching_frames():
+    driver = StubDriver(frames={'body': ('B',)})
+    locator = Locator(By.ID, 'body', driver=driver, frame='A')
+    with pytest.raises(NoSuchElementException):
+        locator.find()
+    assert driver.log == [('frame', 'A'), ('find', 'body')]
+
+
+def test_batch_by_frame_starts_with_the_current_frame_and_keeps_order():
+    items = [('one', ()), ('two', ('A',)), ('three', ()), ('four', ('B',)), ('five', ('A',))]
+    batched = batch_by_frame(items, lambda item: item[1], current=('A',))
+    assert [name for name, _ in batched] == ['two', 'five', 'one', 'three', 'four']
+
+
+class FramedTemplate(PageTemplate):
+    def __init__(self, driver):
+        super(FramedTemplate, self).__init__(driver)
+        self.match_presence(Locator(By.ID, 'header', name='header'))
+        self.match_presence(Locator(By.ID, 'editor', name='editor', frame='A'))
+        self.match_presence(Locator(By.ID, 'footer', name='footer'))
+        self.match_presence(Locator(By.ID, 'toolbar', name='toolbar', frame='A'))
+        self.add_locator(Locator(By.ID, 'preview', name='preview', frame='B'))
+
+
+FRAMES = {'header': (), 'footer': (), 'editor': ('A',), 'toolbar': ('A',), 'preview': ('B',)}
+
+
+def test_matches_groups_conditions_by_frame():
+    driver = StubDriver(frames=FRAMES)
+    template = FramedTemplate(driver)
+
+    assert template.matches()
+    assert switches(driver) == [('frame', 'A')]
+
+    # The next match starts in frame A, where the driver was left.
+    driver.log.clear()
+    assert template.matches()
+    assert switches(driver) == ['default']
+
+
+def test_find_locators_groups_lookups_by_frame_and_keeps_order():
+    driver = StubDriver(frames=FRAMES)
+    template = FramedTemplate(driver)
+
+    names = ('editor', 'header', 'preview', 'toolbar', 'footer')
+    elements = template.find_locators(*names)
+    assert [element.name for element in elements] == list(names)
+    assert switches(driver) == [('frame', 'A'), 'default', ('frame', 'B')]
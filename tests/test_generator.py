@@ -0,0 +1,53 @@
+from selentric.generator import TemplateGenerator, extract_features
+
+
+ARTICLE = '<html><head><title>Panda</title></head><body><div id="content"></div></body></html>'
+FACTS = '<html><head><title>Panda facts</title></head><body><div id="content"></div></body></html>'
+
+
+def test_url_condition_must_not_be_contained_in_other_urls():
+    generator = TemplateGenerator()
+    generator.add_html('Article', ARTICLE, url='https://wiki.org/wiki/Panda')
+    generator.add_html('Facts', FACTS, url='https://wiki.org/wiki/Panda_facts')
+
+    conditions, remaining = generator.conditions('Article')
+    assert ('url', 'Panda') not in conditions
+    assert ('url', '/wiki/Panda') not in conditions
+    assert conditions == [('title', 'Panda')]
+    assert not remaining
+
+    conditions, remaining = generator.conditions('Facts')
+    assert conditions[0][0] in ('url', 'title')
+    assert not remaining
+
+
+def test_pages_that_cannot_be_told_apart_are_flagged():
+    generator = TemplateGenerator()
+    generator.add_html('Article', ARTICLE, url='https://wiki.org/wiki/Panda', title='Panda facts')
+    generator.add_html('Facts', FACTS, url='https://wiki.org/wiki/Panda_facts')
+
+    source = generator.render()
+    assert "match_partial_url('Panda')" not in source
+    assert '# Could not be told apart from 1 page(s) of other page types.' in source
+
+
+def test_single_character_url_segments_are_ignored():
+    features, _ = extract_features('<html></html>', url='https://wiki.org/w/index.php')
+    assert ('url', 'w') not in features
+    assert ('url', 'index.php') in features
+
+
+def test_locator_names_do_not_shadow_template_or_page_attributes():
+    generator = TemplateGenerator()
+    generator.add_html('Login', '<form><input name="locators"><input name="driver"><button id="matches"></button></form>')
+    source = generator.render()
+    for name in ('locators', 'driver', 'matches'):
+        assert f"name='{name}_'" in source
+
+    namespace = {}
+    exec(source, namespace)
+    driver = object()
+    template = namespace['Login'](driver)
+    assert template.driver is driver
+    assert set(template.locators) == {'locators_', 'driver_', 'matches_'}
+    assert callable(template.matches)
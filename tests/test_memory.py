@@ -0,0 +1,53 @@
+from selentric import By, Locator, Page, PageTemplate
+
+
+class StubElement(object):
+    def __init__(self, name):
+        self.name = name
+
+    def find_element(self, by, value):
+        return StubElement(value)
+
+    def find_elements(self, by, value):
+        return [StubElement(value), StubElement(value)]
+
+
+class StubDriver(StubElement):
+    def __init__(self):
+        super(StubDriver, self).__init__('driver')
+
+
+class ResultsTemplate(PageTemplate):
+    def __init__(self, driver, keep_results=True):
+        super(ResultsTemplate, self).__init__(driver, keep_results=keep_results)
+        results_list = Locator(By.CLASS_NAME, 'results', driver=driver)
+        self.add_locator(Locator(By.TAG_NAME, 'li', name='results', parent=results_list, multiple=True))
+        self.add_locator(Locator(By.ID, 'search', name='search_input'))
+
+
+def test_memory_report_counts_unregistered_parent_locators():
+    template = ResultsTemplate(StubDriver())
+    template.find_locators('results', 'search_input')
+
+    report = template.memory_report()
+    assert report['locators'] == 2
+    assert report['parent_locators'] == 1
+    assert set(report['by_locator']) == {'results', 'search_input', 'results.parent'}
+    assert report['by_locator']['results.parent']['elements'] == 1
+    assert report['elements'] == 2 + 1 + 1
+
+    template.release()
+    assert template.memory_report()['elements'] == 0
+
+
+def test_keep_results_false_releases_after_page_access():
+    driver = StubDriver()
+    page = Page(ResultsTemplate(driver, keep_results=False), driver)
+
+    assert page.search_input.name == 'search'
+    assert len(page.results) == 2
+    assert page.memory_report()['elements'] == 0
+
+    # Finding the Locator directly keeps the result.
+    page.locator('search_input').find()
+    assert page.memory_report()['elements'] == 1
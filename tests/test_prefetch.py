@@ -0,0 +1,137 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.remote.webelement import WebElement
+
+from selentric import By, EC, Locator, Page, PageTemplate
+from selentric.prefetch import PrefetchedElement, TemplateWatcher
+
+
+class StubElement(WebElement):
+    def find_element(self, by, value):
+        return self.parent.find_element(by, value)
+
+    def find_elements(self, by, value):
+        return self.parent.find_elements(by, value)
+
+
+class StubDriver(object):
+    """
+    Finds an element for every lookup except the ones listed in `missing`,
+    and counts the lookups.
+    """
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.lookups = []
+        self.switch_to = self
+
+    def find_element(self, by, value):
+        self.lookups.append(value)
+        if value in self.missing:
+            raise NoSuchElementException(value)
+        return StubElement(self, value)
+
+    def find_elements(self, by, value):
+        self.lookups.append(value)
+        return [] if value in self.missing else [StubElement(self, value)]
+
+    def default_content(self):
+        pass
+
+    def frame(self, frame):
+        pass
+
+    def execute_async_script(self, script, *args):
+        raise AssertionError('The watch script should not run for unsupported templates.')
+
+
+class CardTemplate(PageTemplate):
+    def __init__(self, driver):
+        super(CardTemplate, self).__init__(driver)
+        self.match_partial_url('cards')
+        self.match_title('Cards')
+        self.match_presence(Locator(By.ID, 'header', name='header'))
+        self.match_element_text(Locator(By.CLASS_NAME, 'count'), '3 cards')
+        cards = Locator(By.ID, 'cards', driver=driver)
+        self.add_locator(Locator(By.CLASS_NAME, 'card', name='cards', parent=cards, multiple=True))
+        self.add_locator(Locator(By.CLASS_NAME, 'title', name='card_title', parent=cards))
+
+
+def test_conditions_and_locators_are_translated_for_the_script():
+    watcher = TemplateWatcher(CardTemplate(StubDriver()), ['cards', 'card_title'], properties=('text', 'value'))
+    assert watcher.supported
+    assert watcher.conditions == [
+        ['url_contains', 'cards'],
+        ['title_is', 'Cards'],
+        ['presence', ['id', 'header']],
+        ['text', ['class name', 'count'], '3 cards'],
+    ]
+    # The shared parent is only resolved once.
+    assert watcher.locators == [
+        {'by': 'id', 'value': 'cards', 'multiple': False, 'parent': -1, 'shadowRoot': False},
+        {'by': 'class name', 'value': 'card', 'multiple': True, 'parent': 0, 'shadowRoot': False},
+        {'by': 'class name', 'value': 'title', 'multiple': False, 'parent': 0, 'shadowRoot': False},
+    ]
+    assert watcher.indexes == [1, 2]
+    assert watcher.properties == ['text', 'value']
+
+
+@pytest.mark.parametrize('extend', [
+    lambda template: template.match_alert_present(),
+    lambda template: template.match_presence(Locator(By.ID, 'editor', frame='editor_frame')),
+    lambda template: template.expected_conditions.append((lambda *args: True, [])),
+    lambda template: template.add_locator(Locator(By.ID, 'body', name='framed', frame='editor_frame')),
+])
+def test_templates_the_script_cannot_check_are_unsupported(extend):
+    template = CardTemplate(StubDriver())
+    extend(template)
+    names = ['framed'] if 'framed' in template.locators else ['cards']
+    assert not TemplateWatcher(template, names).supported
+
+
+def test_store_hands_prefetched_elements_to_the_locators():
+    driver = StubDriver()
+    template = CardTemplate(driver)
+    watcher = TemplateWatcher(template, ['cards', 'card_title'], properties=('text', 'value'))
+    watcher.store({
+        'elements': [WebElement(driver, 'cards'), [WebElement(driver, 'a'), WebElement(driver, 'b')], None],
+        'properties': [{'text': ''}, [{'text': 'A', 'value': '1'}, {'text': 'B', 'value': '2'}], None],
+    })
+
+    cards = template.locators['cards'].prefetched
+    assert [type(card) for card in cards] == [PrefetchedElement, PrefetchedElement]
+    assert [(card.id, card.text, card.get_attribute('value')) for card in cards] == [('a', 'A', '1'), ('b', 'B', '2')]
+    assert template.locators['card_title'].prefetched is None
+
+    # The prefetched elements are used once, without a lookup.
+    assert template.find_locator('cards') == cards
+    assert driver.lookups == []
+    template.find_locator('cards')
+    assert driver.lookups == ['cards', 'card']
+
+
+class FramedCardTemplate(CardTemplate):
+    def __init__(self, driver):
+        super(FramedCardTemplate, self).__init__(driver)
+        self.add_locator(Locator(By.ID, 'card', name='card', frame='preview'))
+        self.add_locator(Locator(By.ID, 'missing', name='missing'))
+        self.add_locator(Locator(By.CLASS_NAME, 'empty', name='empty', multiple=True))
+
+
+class CardPage(Page):
+    def __init__(self, driver):
+        super(CardPage, self).__init__(FramedCardTemplate(driver), driver)
+
+
+def test_fallback_prefetches_locators_and_skips_missing_ones(monkeypatch):
+    driver = StubDriver(missing=('missing', 'empty'))
+    page = CardPage(driver)
+    monkeypatch.setattr(page.matcher, 'matches', lambda timeout=.01, **kwargs: True)
+
+    page.expect('card', 'missing', 'empty').wait_for_match(timeout=1)
+    assert driver.lookups == ['missing', 'empty', 'card']
+
+    driver.lookups.clear()
+    assert page.card.id == 'card'
+    assert driver.lookups == []
+    with pytest.raises(NoSuchElementException):
+        page.missing
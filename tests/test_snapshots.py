@@ -0,0 +1,57 @@
+import threading
+
+from selentric.snapshots import CAPTURE_SCRIPT, SnapshotArchive, SnapshotWriter
+
+
+class StubDriver(object):
+    def __init__(self, source):
+        self.source = source
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return [self.source, 'https://wiki.org/wiki/Panda', 'Panda']
+
+
+def test_capture_reads_source_url_and_title_in_one_script(tmp_path):
+    driver = StubDriver('<html><body>Panda</body></html>')
+    with SnapshotWriter(str(tmp_path)) as writer:
+        assert writer.capture(driver, page='Article')
+    assert driver.scripts == [CAPTURE_SCRIPT]
+
+    archive = SnapshotArchive(str(tmp_path))
+    snapshot, = list(archive)
+    assert (snapshot['page'], snapshot['url'], snapshot['title']) == ('Article', 'https://wiki.org/wiki/Panda', 'Panda')
+    assert archive.source(snapshot) == '<html><body>Panda</body></html>'
+
+
+def test_duplicate_sources_are_stored_once(tmp_path):
+    with SnapshotWriter(str(tmp_path)) as writer:
+        writer.submit('<html></html>')
+        writer.submit('<html></html>')
+        writer.flush()
+        assert (writer.written, writer.deduplicated) == (2, 1)
+
+
+def test_pending_snapshots_are_capped_by_encoded_bytes(tmp_path):
+    writer = SnapshotWriter(str(tmp_path), max_pending_bytes=100, block=False)
+    started, unblock = threading.Event(), threading.Event()
+    write = writer._write
+
+    def blocked_write(*args):
+        started.set()
+        unblock.wait()
+        write(*args)
+
+    writer._write = blocked_write
+    assert writer.submit('<html></html>')
+    started.wait()
+
+    assert writer.submit('a' * 10)
+    # 40 characters, but 120 bytes once encoded.
+    assert not writer.submit('熊猫' * 20)
+    assert writer.dropped == 1
+
+    unblock.set()
+    writer.close()
+    assert writer.written == 2
@@ -0,0 +1,239 @@
+import threading
+from time import sleep, time
+
+import pytest
+
+from selentric import Locator
+from selentric.workers import JobQueue, Worker, import_path
+
+
+class StubDriver(object):
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+class StubController(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def echo(self, value):
+        return value
+
+    def explode(self):
+        raise ValueError('boom')
+
+    def slow(self, seconds):
+        sleep(seconds)
+        return 'slow'
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease=5)
+    yield queue
+    queue.close()
+
+
+def make_worker(queue, name='a', **kwargs):
+    drivers = []
+
+    def driver_factory():
+        drivers.append(StubDriver())
+        return drivers[-1]
+
+    worker = Worker(queue, driver_factory, name=name, poll_frequency=.01, **kwargs)
+    return worker, drivers
+
+
+def make_available(queue, job_id):
+    queue.connection.execute('UPDATE jobs SET available_at = 0 WHERE id = ?', (job_id,))
+
+
+def test_completed_job_stores_result(queue):
+    job_id = queue.enqueue(StubController, 'echo', {'animal': 'Red Panda'})
+    worker, drivers = make_worker(queue)
+    assert worker.run(max_jobs=1) == 1
+
+    job = queue.job(job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == {'animal': 'Red Panda'}
+    assert job['attempts'] == 1
+    assert job['error'] is None
+    assert drivers[0].quit_called
+
+
+def test_failed_job_is_retried_with_backoff(queue):
+    job_id = queue.enqueue(StubController, 'explode', retries=2)
+    worker, _ = make_worker(queue, backoff=10)
+
+    started = time()
+    worker.run_job(queue.claim('a'))
+    job = queue.job(job_id)
+    assert job['status'] == 'queued'
+    assert 'ValueError: boom' in job['error']
+    assert started + 10 <= job['available_at'] <= time() + 10
+    assert queue.claim('a') is None
+
+    make_available(queue, job_id)
+    worker.run_job(queue.claim('a'))
+    assert queue.job(job_id)['available_at'] >= started + 20
+
+    make_available(queue, job_id)
+    worker.run_job(queue.claim('a'))
+    job = queue.job(job_id)
+    assert job['status'] == 'failed'
+    assert job['attempts'] == 3
+    assert queue.claim('a') is None
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue):
+    job_id = queue.enqueue(StubController, 'echo', 1, retries=1)
+    queue.claim('a')
+    queue.connection.execute('UPDATE jobs SET lease_expires = 0 WHERE id = ?', (job_id,))
+
+    job = queue.claim('b')
+    assert job['id'] == job_id
+    assert job['attempts'] == 2
+    assert queue.job(job_id)['error'] == 'Lease held by a expired.'
+
+    # The first worker lost the job, so it can't record anything.
+    assert not queue.renew(job_id, 'a')
+    assert not queue.complete(job_id, 'a', '"stale"')
+    assert not queue.fail(job_id, 'a', 'stale')
+    assert queue.job(job_id)['status'] == 'running'
+
+    assert queue.complete(job_id, 'b', '2')
+    job = queue.job(job_id)
+    assert (job['status'], job['result'], job['worker'], job['error']) == ('done', 2, 'b', None)
+
+
+def test_expired_lease_without_retries_fails_the_job(queue):
+    job_id = queue.enqueue(StubController, 'echo', 1)
+    queue.claim('a')
+    queue.connection.execute('UPDATE jobs SET lease_expires = 0 WHERE id = ?', (job_id,))
+
+    assert queue.claim('b') is None
+    job = queue.job(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Lease held by a expired.'
+
+
+def test_lease_is_renewed_while_the_job_runs(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    queue = JobQueue(path, lease=.3)
+    job_id = queue.enqueue(StubController, 'slow', 1, timeout=5)
+    worker, _ = make_worker(queue)
+
+    stolen = []
+
+    def steal():
+        other = JobQueue(path, lease=.3)
+        while not stolen and other.job(job_id)['status'] == 'running':
+            job = other.claim('b')
+            if job is not None:
+                stolen.append(job)
+            sleep(.05)
+        other.close()
+
+    job = queue.claim('a')
+    thief = threading.Thread(target=steal)
+    thief.start()
+    worker.run_job(job)
+    thief.join()
+
+    job = queue.job(job_id)
+    assert not stolen
+    assert (job['status'], job['result'], job['worker'], job['attempts']) == ('done', 'slow', 'a', 1)
+    queue.close()
+
+
+def test_job_without_timeout_is_limited_by_the_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease=.3)
+    job_id = queue.enqueue(StubController, 'slow', 2)
+    worker, drivers = make_worker(queue)
+
+    worker.run_job(queue.claim('a'))
+    job = queue.job(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Timed out after 0.3 seconds.'
+    assert drivers[0].quit_called
+    queue.close()
+
+
+def test_stats(queue):
+    for value in range(3):
+        queue.enqueue(StubController, 'echo', value)
+    queue.enqueue(StubController, 'explode')
+    worker, _ = make_worker(queue)
+    assert worker.run(idle_timeout=0) == 4
+
+    assert queue.counts() == {'done': 3, 'failed': 1}
+    stats = queue.stats()
+    controller = import_path(StubController)
+    echo = stats[f'{controller}.echo']
+    assert (echo['done'], echo['failed']) == (3, 0)
+    assert echo['latency_p50'] >= 0
+    assert stats[f'{controller}.explode']['failed'] == 1
+    assert queue.stats(since=time() + 60) == {}
+
+
+class LocatorController(StubController):
+    def global_driver(self):
+        return Locator.driver is self.driver
+
+
+class SlowController(StubController):
+    def __init__(self, driver):
+        super(SlowController, self).__init__(driver)
+        sleep(.5)
+
+
+def test_worker_sets_the_global_locator_driver(queue):
+    job_id = queue.enqueue(LocatorController, 'global_driver')
+    worker, drivers = make_worker(queue)
+    worker.run_job(queue.claim('a'))
+
+    assert queue.job(job_id)['result'] is True
+    assert Locator.driver is drivers[0]
+    worker.quit()
+    assert Locator.driver is None
+
+
+def test_session_started_by_a_timed_out_job_is_not_used(queue):
+    def hanging_factory():
+        sleep(.5)
+        drivers.append(StubDriver())
+        return drivers[-1]
+
+    drivers = []
+    worker = Worker(queue, hanging_factory, name='a')
+    job_id = queue.enqueue(StubController, 'echo', 1, timeout=.1)
+    worker.run_job(queue.claim('a'))
+    assert queue.job(job_id)['status'] == 'failed'
+    assert worker.driver is None
+
+    sleep(.6)
+    # The hung session was quit when it finally started.
+    assert drivers[0].quit_called
+    assert worker.driver is None
+    assert Locator.driver is not drivers[0]
+
+
+def test_controller_that_times_out_quits_its_session(queue):
+    job_id = queue.enqueue(SlowController, 'echo', 1, timeout=.1)
+    worker, drivers = make_worker(queue)
+    worker.run_job(queue.claim('a'))
+
+    assert queue.job(job_id)['status'] == 'failed'
+    assert drivers[0].quit_called
+    assert (worker.driver, worker.controllers) == (None, {})
+    sleep(.5)
+    assert (worker.driver, worker.controllers) == (None, {})
+
+    job_id = queue.enqueue(StubController, 'echo', 2)
+    worker.run_job(queue.claim('a'))
+    assert queue.job(job_id)['result'] == 2
+    assert worker.driver is drivers[1]
@@ -0,0 +1,543 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import traceback
+from time import sleep, time
+
+from . import Locator
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    controller TEXT NOT NULL,
+    method TEXT NOT NULL,
+    args TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 1,
+    timeout REAL,
+    available_at REAL NOT NULL,
+    lease_expires REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at);
+"""
+
+
+def import_path(obj):
+    """
+    Get the `module:qualname` import path of a class or function.
+
+    :param obj:
+    :return str:
+    """
+    return f'{obj.__module__}:{obj.__qualname__}'
+
+
+def load(path: str):
+    """
+    Import the object at a `module:qualname` import path.
+
+    :param path:
+    :return:
+    """
+    module_name, _, qualname = path.partition(':')
+    obj = importlib.import_module(module_name)
+    for attribute in qualname.split('.'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def to_json(value):
+    """
+    Serialize the return value of a controller method.  Web elements are
+    stored as their text, anything else JSON can't handle as its repr.
+
+    :param value:
+    :return str:
+    """
+    def default(obj):
+        if hasattr(type(obj), 'text'):
+            return obj.text
+        return repr(obj)
+    return json.dumps(value, default=default)
+
+
+class JobQueue(object):
+    """
+    A durable queue of `Page` controller jobs stored in a SQLite database.
+
+    A job is a call to a method on a `Page` controller, e.g.
+    `WikipediaSearch.search('Red Panda')`.  Jobs are claimed by `Worker`s,
+    which can run in any number of processes.  Workers on other hosts can
+    share the queue if the database lives on a filesystem with working file
+    locks; pass `wal=False` in that case, since SQLite's WAL mode only works
+    on a single host.
+
+    A claimed job is leased to its worker for `lease` seconds, and the
+    worker renews the lease while the job runs.  If the worker dies, the job
+    goes back on the queue once the lease expires.  Only the worker holding
+    the lease can record the job's result.
+
+    Basic Example:
+        queue = JobQueue('jobs.sqlite3')
+        for query in ['Red Panda', 'Tree Frog']:
+            queue.enqueue(WikipediaSearch, 'search', query, retries=2, timeout=60)
+
+        # Elsewhere, in as many processes as you like:
+        Worker(JobQueue('jobs.sqlite3'), make_driver).run()
+    """
+    def __init__(self, path: str, lease=300, wal=True, timeout=30):
+        """
+        :param path: SQLite database file
+        :param lease: seconds a job is leased to a worker between renewals, and
+            the timeout of jobs enqueued without one
+        :param wal: use SQLite's write-ahead log (single host only)
+        :param timeout: seconds to wait for another process's lock
+        """
+        self.path = path
+        self.lease = lease
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        if wal:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def enqueue(self, controller, method: str, *args, retries=0, timeout=None, delay=0, **kwargs):
+        """
+        Add a job to the queue.  `controller` is a `Page` subclass or its
+        `module:ClassName` import path.  The args and kwargs must be JSON
+        serializable.
+
+        Returns the job id.
+
+        :param controller:
+        :param method:
+        :param args:
+        :param retries: times the job is retried after failing
+        :param timeout: seconds the job may run before it is failed, defaults to the queue's lease
+        :param delay: seconds to wait before the job may be claimed
+        :param kwargs:
+        :return int:
+        """
+        if not isinstance(controller, str):
+            controller = import_path(controller)
+        now = time()
+        cursor = self.connection.execute(
+            'INSERT INTO jobs (controller, method, args, kwargs, max_attempts, timeout, available_at, created) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (controller, method, json.dumps(args), json.dumps(kwargs), retries + 1, timeout, now + delay, now)
+        )
+        return cursor.lastrowid
+
+    def claim(self, worker: str):
+        """
+        Claim the oldest job that is ready to run, or a job whose worker's
+        lease has run out.  Returns None if there is nothing to do.
+
+        :param worker:
+        :return dict:
+        """
+        now = time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.connection.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'running' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                self.connection.execute('COMMIT')
+                return None
+            job = dict(row)
+            error = None
+            if job['status'] == 'running':
+                # The worker holding the lease died, count it as a failed attempt.
+                error = f"Lease held by {job['worker']} expired."
+                if job['attempts'] >= job['max_attempts']:
+                    self._finish(job['id'], job['worker'], 'failed', error=error)
+                    self.connection.execute('COMMIT')
+                    return self.claim(worker)
+            self.connection.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                "started = ?, lease_expires = ?, error = COALESCE(?, error) WHERE id = ?",
+                (worker, now, now + self.lease, error, job['id'])
+            )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        job.update(status='running', attempts=job['attempts'] + 1, worker=worker, started=now)
+        job['args'] = json.loads(job['args'])
+        job['kwargs'] = json.loads(job['kwargs'])
+        return job
+
+    def renew(self, job_id: int, worker: str):
+        """
+        Extend the worker's lease on a running job by `lease` seconds.
+
+        Returns False if the worker no longer holds the job, because its lease
+        ran out and another worker claimed it.
+
+        :param job_id:
+        :param worker:
+        :return bool:
+        """
+        cursor = self.connection.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time() + self.lease, job_id, worker)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: int, worker: str, result=None):
+        """
+        Record that a job finished, along with its JSON serialized result.
+
+        Returns False if the worker no longer holds the job, in which case
+        nothing is recorded.
+
+        :param job_id:
+        :param worker:
+        :param result:
+        :return bool:
+        """
+        return self._finish(job_id, worker, 'done', result=result)
+
+    def fail(self, job_id: int, worker: str, error: str, backoff=1.0):
+        """
+        Record that a job failed.  It goes back on the queue if it has
+        retries left, after waiting `backoff` seconds times the number of
+        attempts so far.  Nothing is recorded if the worker no longer holds
+        the job.
+
+        Returns True if the job will be retried.
+
+        :param job_id:
+        :param worker:
+        :param error:
+        :param backoff:
+        :return bool:
+        """
+        now = time()
+        cursor = self.connection.execute(
+            "UPDATE jobs SET status = 'queued', error = ?, lease_expires = NULL, available_at = ? + attempts * ? "
+            "WHERE id = ? AND worker = ? AND status = 'running' AND attempts < max_attempts",
+            (error, now, backoff, job_id, worker)
+        )
+        if cursor.rowcount:
+            return True
+        self._finish(job_id, worker, 'failed', error=error)
+        return False
+
+    def _finish(self, job_id, worker, status, result=None, error=None):
+        cursor = self.connection.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, lease_expires = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, result, error, time(), job_id, worker)
+        )
+        return cursor.rowcount > 0
+
+    def job(self, job_id: int):
+        """
+        Get a job by id, with its result decoded.
+
+        :param job_id:
+        :return dict:
+        """
+        row = self.connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['args'] = json.loads(job['args'])
+        job['kwargs'] = json.loads(job['kwargs'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def counts(self):
+        """
+        Count the jobs in each status.
+
+        :return dict:
+        """
+        rows = self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def stats(self, since: float = None):
+        """
+        Report throughput and latency for each controller method, over the
+        jobs that finished after `since` (a unix timestamp), or all finished
+        jobs.
+
+        Latency is the run time of the last attempt.  Throughput is finished
+        jobs per second between the first and last finish.
+
+        :param since:
+        :return dict:
+        """
+        rows = self.connection.execute(
+            "SELECT controller, method, status, started, finished FROM jobs "
+            "WHERE finished IS NOT NULL AND finished >= ? ORDER BY finished",
+            (since or 0,)
+        ).fetchall()
+        grouped = {}
+        for controller, method, status, started, finished in rows:
+            grouped.setdefault(f'{controller}.{method}', []).append((status, finished - started, finished))
+
+        report = {}
+        for name, jobs in grouped.items():
+            latencies = sorted(latency for _, latency, _ in jobs)
+            elapsed = jobs[-1][2] - jobs[0][2]
+            report[name] = {
+                'done': sum(1 for status, _, _ in jobs if status == 'done'),
+                'failed': sum(1 for status, _, _ in jobs if status == 'failed'),
+                'throughput': len(jobs) / elapsed if elapsed > 0 else None,
+                'latency_mean': sum(latencies) / len(latencies),
+                'latency_p50': latencies[len(latencies) // 2],
+                'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * .95))],
+            }
+        return report
+
+
+class Worker(object):
+    """
+    Run jobs from a `JobQueue` with one browser session.
+
+    `driver_factory` is called with no arguments to start a web driver.  The
+    driver is also set as the global `Locator.driver`, for Locators that
+    don't have a driver of their own.  The session is reused between jobs,
+    and each controller class is only constructed once per session.  When a job runs past its timeout (or the
+    queue's `lease`, for jobs without one) the job is failed and the session
+    is quit and replaced, since a hung browser can't be trusted with the next
+    job.  The same happens if the worker loses its lease on the job.
+
+    Return values are stored as JSON.  Web elements are stored as their text.
+    """
+    def __init__(self, queue: JobQueue, driver_factory, name: str = None, poll_frequency=1.0, backoff=1.0, serialize=to_json):
+        """
+        :param queue:
+        :param driver_factory:
+        :param name: worker name recorded on claimed jobs
+        :param poll_frequency: seconds to wait when the queue is empty
+        :param backoff: seconds to wait before a retry, times the attempt number
+        :param serialize: function turning a result into a JSON string
+        """
+        self.queue = queue
+        self.driver_factory = driver_factory
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_frequency = poll_frequency
+        self.backoff = backoff
+        self.serialize = serialize
+        self.driver = None
+        self.controllers = {}
+        self._lock = threading.Lock()
+
+    def run(self, max_jobs: int = None, idle_timeout: float = None):
+        """
+        Claim and run jobs until `max_jobs` jobs have run, or the queue has
+        been empty for `idle_timeout` seconds.  Both default to running
+        forever.  The browser session is quit when the worker stops.
+
+        Returns the number of jobs run.
+
+        :param max_jobs:
+        :param idle_timeout:
+        :return int:
+        """
+        ran = 0
+        idle_since = time()
+        try:
+            while max_jobs is None or ran < max_jobs:
+                job = self.queue.claim(self.name)
+                if job is None:
+                    if idle_timeout is not None and time() - idle_since > idle_timeout:
+                        break
+                    sleep(self.poll_frequency)
+                    continue
+                self.run_job(job)
+                ran += 1
+                idle_since = time()
+        finally:
+            self.quit()
+        return ran
+
+    def run_job(self, job: dict):
+        """
+        Run a claimed job and record its result or error.
+
+        :param job:
+        :return:
+        """
+        outcome = {}
+        abandoned = threading.Event()
+        driver, controllers = self.driver, dict(self.controllers)
+
+        def target():
+            # A job that runs past its timeout is left running on this thread,
+            # so it only writes to local state.  The worker takes over the
+            # session once the job has finished in time.
+            try:
+                session = driver
+                if session is None:
+                    session = self.driver_factory()
+                    with self._lock:
+                        if abandoned.is_set():
+                            _quit_driver(session)
+                            return
+                        outcome['driver'] = session
+                        Locator.set_driver(session)
+                if job['controller'] not in controllers:
+                    controllers[job['controller']] = load(job['controller'])(session)
+                result = getattr(controllers[job['controller']], job['method'])(*job['args'], **job['kwargs'])
+                outcome['result'] = self.serialize(result)
+            except BaseException:
+                outcome['error'] = traceback.format_exc()
+
+        timeout = job['timeout'] if job['timeout'] is not None else self.queue.lease
+        deadline = time() + timeout
+        thread = threading.Thread(target=target, name=f'selentric-job-{job["id"]}', daemon=True)
+        thread.start()
+        # Wake up a few times per lease to renew it while the job runs.
+        while True:
+            thread.join(max(min(self.queue.lease / 3, deadline - time()), 0))
+            if not thread.is_alive() or time() >= deadline:
+                break
+            if not self.queue.renew(job['id'], self.name):
+                # Another worker took the job over, its result isn't ours to record.
+                self._abandon(abandoned, outcome)
+                return
+
+        if thread.is_alive():
+            self._abandon(abandoned, outcome)
+            self.queue.fail(job['id'], self.name, f'Timed out after {timeout} seconds.', self.backoff)
+            return
+        self.driver = outcome.get('driver', driver)
+        self.controllers = controllers
+        if 'error' in outcome:
+            self.queue.fail(job['id'], self.name, outcome['error'], self.backoff)
+        else:
+            self.queue.complete(job['id'], self.name, outcome['result'])
+
+    def controller(self, path: str):
+        """
+        Get the controller instance for a `module:ClassName` import path,
+        starting the browser session if needed.
+
+        :param path:
+        :return:
+        """
+        if self.driver is None:
+            self.driver = self.driver_factory()
+            Locator.set_driver(self.driver)
+        if path not in self.controllers:
+            self.controllers[path] = load(path)(self.driver)
+        return self.controllers[path]
+
+    def quit(self):
+        """
+        Quit the browser session.  A new one is started for the next job.
+
+        :return:
+        """
+        driver, self.driver = self.driver, None
+        self.controllers = {}
+        if driver is not None:
+            if Locator.driver is driver:
+                Locator.set_driver(None)
+            _quit_driver(driver)
+
+    def _abandon(self, abandoned: threading.Event, outcome: dict):
+        """
+        Give up on a job that is still running and quit its browser session,
+        including a session the job started that the worker hasn't taken
+        over yet.
+        """
+        with self._lock:
+            abandoned.set()
+            if 'driver' in outcome:
+                self.driver = outcome['driver']
+        self.quit()
+
+
+def _quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _work(path, driver_factory, kwargs):
+    queue = JobQueue(path, wal=kwargs.pop('wal'))
+    max_jobs = kwargs.pop('max_jobs')
+    idle_timeout = kwargs.pop('idle_timeout')
+    try:
+        Worker(queue, driver_factory, **kwargs).run(max_jobs=max_jobs, idle_timeout=idle_timeout)
+    finally:
+        queue.close()
+
+
+def run_workers(path: str, driver_factory, processes: int = None, wal=True, max_jobs=None, idle_timeout=None, **kwargs):
+    """
+    Start worker processes that each run a `Worker` with its own browser
+    session, and wait for them to stop.  `driver_factory` must be a module
+    level function so it can be sent to the worker processes.
+
+    Run this on every host sharing the queue to scale out across hosts.
+
+    :param path: SQLite database file of the `JobQueue`
+    :param driver_factory:
+    :param processes: defaults to the number of CPUs
+    :param wal:
+    :param max_jobs: jobs each worker runs before stopping
+    :param idle_timeout: seconds each worker waits on an empty queue before stopping
+    :param kwargs: passed to `Worker`
+    :return:
+    """
+    JobQueue(path, wal=wal).close()
+    kwargs.update(wal=wal, max_jobs=max_jobs, idle_timeout=idle_timeout)
+    workers = [
+        multiprocessing.Process(target=_work, args=(path, driver_factory, dict(kwargs)), name=f'selentric-worker-{i}')
+        for i in range(processes or os.cpu_count() or 1)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run selentric Page controller jobs from a job queue.')
+    parser.add_argument('queue', help='SQLite database file of the job queue')
+    parser.add_argument('--driver', help='module:function that starts a web driver')
+    parser.add_argument('--processes', type=int, help='worker processes to start, defaults to the number of CPUs')
+    parser.add_argument('--idle-timeout', type=float, help='stop after the queue has been empty this many seconds')
+    parser.add_argument('--no-wal', action='store_true', help="don't use SQLite's write-ahead log, for shared filesystems")
+    parser.add_argument('--stats', action='store_true', help='print throughput and latency per controller method and exit')
+    options = parser.parse_args(args)
+
+    if options.stats:
+        queue = JobQueue(options.queue, wal=not options.no_wal)
+        print(json.dumps({'counts': queue.counts(), 'methods': queue.stats()}, indent=2))
+        queue.close()
+        return
+    if not options.driver:
+        parser.error('--driver is required to run workers')
+    run_workers(options.queue, load(options.driver), options.processes, wal=not options.no_wal, idle_timeout=options.idle_timeout)
+
+
+if __name__ == '__main__':
+    main()